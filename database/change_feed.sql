@@ -0,0 +1,75 @@
+-- Change feed triggers (opt-in, ใช้คู่กับ CHANGE_FEED_ENABLED=true ของ Python API)
+--
+-- ไม่ได้ติดตั้งใน init.sql: ทุก transaction ที่ส่ง NOTIFY ต้องถือ lock ระดับ database ตอน commit
+-- ทำให้ transactions เหล่านี้ commit ทีละตัว และ triggers มีผลกับ writes ของทุก service (Go, NestJS, .NET, Python)
+-- ติดตั้ง:  docker compose exec -T postgres psql -U postgres -d performance_test < database/change_feed.sql
+-- ถอดออก: DROP FUNCTION notify_table_change() CASCADE;
+
+-- Change feed: compact NOTIFY per statement on channel 'table_changes' (delivered on commit), e.g.
+-- {"t": "orders", "op": "i", "ids": [101, 102]}. "ids" is null when more than 100 keys changed or on
+-- TRUNCATE, meaning the whole table. TG_ARGV[0] is the key column reported for the table.
+CREATE OR REPLACE FUNCTION notify_table_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    key_column text := TG_ARGV[0];
+    changed_rows text;
+    ids bigint[];
+BEGIN
+    IF TG_OP <> 'TRUNCATE' THEN
+        changed_rows := CASE TG_OP
+            WHEN 'INSERT' THEN format('SELECT %I AS k FROM new_rows', key_column)
+            WHEN 'DELETE' THEN format('SELECT %I AS k FROM old_rows', key_column)
+            ELSE format('SELECT %I AS k FROM old_rows UNION SELECT %I FROM new_rows', key_column, key_column)
+        END;
+        EXECUTE format('SELECT array_agg(k) FROM (SELECT DISTINCT k FROM (%s) c LIMIT 101) s', changed_rows)
+            INTO ids;
+        IF ids IS NULL THEN
+            RETURN NULL;  -- statement changed no rows
+        END IF;
+        IF cardinality(ids) > 100 THEN
+            ids := NULL;
+        END IF;
+    END IF;
+
+    PERFORM pg_notify('table_changes', jsonb_build_object(
+        't', TG_TABLE_NAME, 'op', lower(left(TG_OP, 1)), 'ids', ids)::text);
+    RETURN NULL;
+END;
+$$ language plpgsql;
+
+CREATE OR REPLACE TRIGGER users_notify_insert AFTER INSERT ON users REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('id');
+CREATE OR REPLACE TRIGGER users_notify_update AFTER UPDATE ON users REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('id');
+CREATE OR REPLACE TRIGGER users_notify_delete AFTER DELETE ON users REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('id');
+CREATE OR REPLACE TRIGGER users_notify_truncate AFTER TRUNCATE ON users
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('id');
+
+CREATE OR REPLACE TRIGGER products_notify_insert AFTER INSERT ON products REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('id');
+CREATE OR REPLACE TRIGGER products_notify_update AFTER UPDATE ON products REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('id');
+CREATE OR REPLACE TRIGGER products_notify_delete AFTER DELETE ON products REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('id');
+CREATE OR REPLACE TRIGGER products_notify_truncate AFTER TRUNCATE ON products
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('id');
+
+CREATE OR REPLACE TRIGGER orders_notify_insert AFTER INSERT ON orders REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('id');
+CREATE OR REPLACE TRIGGER orders_notify_update AFTER UPDATE ON orders REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('id');
+CREATE OR REPLACE TRIGGER orders_notify_delete AFTER DELETE ON orders REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('id');
+CREATE OR REPLACE TRIGGER orders_notify_truncate AFTER TRUNCATE ON orders
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('id');
+
+-- order_items report the order they belong to
+CREATE OR REPLACE TRIGGER order_items_notify_insert AFTER INSERT ON order_items REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('order_id');
+CREATE OR REPLACE TRIGGER order_items_notify_update AFTER UPDATE ON order_items REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('order_id');
+CREATE OR REPLACE TRIGGER order_items_notify_delete AFTER DELETE ON order_items REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('order_id');
+CREATE OR REPLACE TRIGGER order_items_notify_truncate AFTER TRUNCATE ON order_items
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('order_id');
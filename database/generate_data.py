@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Synthetic Data Generator
+ขยาย dataset ของ init.sql ให้ใหญ่ระดับล้าน rows เพื่อให้ benchmark ไม่วิ่งอยู่แค่ใน cache
+
+Generates users, products, orders and order_items with Zipfian (skewed) user activity
+and product popularity, and loads them through COPY from parallel worker processes.
+Output is deterministic for a given --seed and --end-date.
+
+Usage:
+  python generate_data.py --users 1000000 --products 10000 --orders 3300000 --items-per-order 3
+  python generate_data.py --truncate --workers 8 --seed 42
+"""
+
+import argparse
+import io
+from array import array
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+try:
+    import psycopg2
+except ImportError:
+    print("❌ psycopg2 is required: pip install psycopg2-binary")
+    sys.exit(1)
+
+CATEGORIES = ['electronics', 'books', 'clothing', 'home', 'sports', 'toys', 'beauty', 'grocery']
+CITIES = ['Bangkok', 'Chiang Mai', 'Phuket', 'Pattaya', 'Khon Kaen', 'Udon Thani',
+          'Nakhon Ratchasima', 'Hat Yai', 'Rayong', 'Hua Hin']
+# (status, weight) - completed orders dominate like production traffic
+STATUSES = [('completed', 60), ('shipped', 15), ('pending', 20), ('cancelled', 5)]
+# Rows per random stream. Each block of users/orders is seeded on its own and COPY chunks are whole
+# blocks, so the generated rows do not depend on --chunk-size or --workers
+RNG_BLOCK = 1000
+
+
+def build_dsn(args):
+    if args.dsn:
+        return args.dsn
+    return (f"host={os.getenv('DB_HOST', 'localhost')} "
+            f"port={os.getenv('DB_PORT', '5434')} "  # docker-compose maps postgres to 5434
+            f"dbname={os.getenv('DB_NAME', 'performance_test')} "
+            f"user={os.getenv('DB_USER', 'postgres')} "
+            f"password={os.getenv('DB_PASSWORD', 'password')}")
+
+
+class ZipfSampler:
+    """Samples ranks 0..n-1 with P(k) proportional to 1 / (k + 1) ** s"""
+
+    def __init__(self, n, s):
+        self.cumulative = list(itertools.accumulate(1.0 / (k + 1) ** s for k in range(n)))
+        self.total = self.cumulative[-1]
+
+    def sample(self, rng):
+        return bisect_left(self.cumulative, rng.random() * self.total)
+
+
+class RankPermutation:
+    """Maps Zipf ranks onto ids so the "hot" rows are spread over the id range"""
+
+    def __init__(self, n, seed):
+        rng = random.Random(f"{seed}:permutation:{n}")
+        self.n = n
+        self.multiplier = 1
+        if n > 2:
+            while True:
+                candidate = rng.randrange(n // 2, n)
+                if math.gcd(candidate, n) == 1:
+                    self.multiplier = candidate
+                    break
+        self.offset = rng.randrange(n)
+
+    def __call__(self, rank):
+        return (rank * self.multiplier + self.offset) % self.n
+
+
+def block_rng(seed, stream, offset):
+    return random.Random(f"{seed}:{stream}:{offset // RNG_BLOCK}")
+
+
+def signup_ages(config):
+    """Seconds between each user's created_at and --end-date; orders are placed after it"""
+    rng = random.Random(f"{config['seed']}:signups")
+    span_seconds = config['days'] * 86400
+    return array('q', (rng.randrange(span_seconds) for _ in range(config['users'])))
+
+
+def chunk_ranges(total, chunk_size):
+    chunk_size = -(-chunk_size // RNG_BLOCK) * RNG_BLOCK  # whole RNG blocks
+    return [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+
+def copy_rows(cursor, table, columns, lines):
+    buffer = io.StringIO()
+    buffer.writelines(lines)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+def fmt_ts(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+# ---------------------------------------------------------------------------
+# Worker process state (set once per process by _init_worker)
+# ---------------------------------------------------------------------------
+_worker = {}
+
+
+def _init_worker(dsn, config, product_prices):
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cursor:
+        # Bulk load: losing the last few chunks on a crash is acceptable
+        cursor.execute("SET synchronous_commit = off")
+    conn.commit()
+
+    _worker['conn'] = conn
+    _worker['config'] = config
+    _worker['product_prices'] = product_prices
+    _worker['user_sampler'] = ZipfSampler(config['users'], config['zipf_s'])
+    _worker['user_permutation'] = RankPermutation(config['users'], config['seed'])
+    _worker['product_sampler'] = ZipfSampler(len(product_prices), config['zipf_s'])
+    _worker['product_permutation'] = RankPermutation(len(product_prices), config['seed'] + 1)
+    _worker['signup_ages'] = signup_ages(config)
+
+
+def _load_users_chunk(bounds):
+    start, end = bounds
+    config = _worker['config']
+    end_date = config['end_date']
+    base_id = config['user_base']
+    ages = _worker['signup_ages']
+
+    lines = []
+    for offset in range(start, end):
+        if offset % RNG_BLOCK == 0:
+            rng = block_rng(config['seed'], 'users', offset)
+        user_id = base_id + offset + 1
+        created = end_date - timedelta(seconds=ages[offset])
+        lines.append(f"{user_id}\tUser {user_id}\tuser{user_id}@bench.example.com\t"
+                     f"{rng.randint(18, 70)}\t{rng.choice(CITIES)}\t"
+                     f"{fmt_ts(created)}\t{fmt_ts(created)}\n")
+
+    conn = _worker['conn']
+    with conn.cursor() as cursor:
+        copy_rows(cursor, 'users', ['id', 'name', 'email', 'age', 'city', 'created_at', 'updated_at'], lines)
+    conn.commit()
+    return 'users', end - start
+
+
+def _load_orders_chunk(bounds):
+    start, end = bounds
+    config = _worker['config']
+    prices = _worker['product_prices']
+    user_sampler, user_permutation = _worker['user_sampler'], _worker['user_permutation']
+    product_sampler, product_permutation = _worker['product_sampler'], _worker['product_permutation']
+    statuses, status_weights = zip(*STATUSES)
+    status_cumulative = list(itertools.accumulate(status_weights))
+    end_date = config['end_date']
+    ages = _worker['signup_ages']
+    max_items = config['items_per_order'] * 2 - 1
+
+    order_lines = []
+    item_lines = []
+    for offset in range(start, end):
+        if offset % RNG_BLOCK == 0:
+            rng = block_rng(config['seed'], 'orders', offset)
+        order_id = config['order_base'] + offset + 1
+        user_index = user_permutation(user_sampler.sample(rng))
+        user_id = config['user_base'] + user_index + 1
+        # Between the user's signup and --end-date
+        order_date = fmt_ts(end_date - timedelta(seconds=rng.randrange(ages[user_index] + 1)))
+
+        total = 0.0
+        for k in range(rng.randint(1, max_items)):
+            product_index = product_permutation(product_sampler.sample(rng))
+            price = prices[product_index]
+            # Quantity is skewed towards 1
+            quantity = 1 + int(rng.expovariate(1.5))
+            total += price * quantity
+            # Fixed id slots per order so ids don't depend on which worker's COPY commits first
+            item_id = config['item_base'] + offset * max_items + k + 1
+            item_lines.append(f"{item_id}\t{order_id}\t{config['product_base'] + product_index + 1}\t"
+                              f"{quantity}\t{price:.2f}\t{order_date}\n")
+
+        status = statuses[bisect_left(status_cumulative, rng.random() * status_cumulative[-1])]
+        order_lines.append(f"{order_id}\t{user_id}\t{total:.2f}\t{status}\t"
+                           f"{order_date}\t{order_date}\t{order_date}\n")
+
+    conn = _worker['conn']
+    with conn.cursor() as cursor:
+        copy_rows(cursor, 'orders',
+                  ['id', 'user_id', 'total_amount', 'status', 'order_date', 'created_at', 'updated_at'],
+                  order_lines)
+        copy_rows(cursor, 'order_items', ['id', 'order_id', 'product_id', 'quantity', 'price', 'created_at'],
+                  item_lines)
+    conn.commit()
+    return 'orders', len(order_lines), len(item_lines)
+
+
+class DataGenerator:
+    def __init__(self, args):
+        self.args = args
+        self.dsn = build_dsn(args)
+        self.end_date = (datetime.strptime(args.end_date, '%Y-%m-%d') if args.end_date
+                         else datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+
+    def _max_ids(self, cursor):
+        ids = {}
+        for table in ('users', 'products', 'orders', 'order_items'):
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            ids[table] = cursor.fetchone()[0]
+        return ids
+
+    def _load_products(self, cursor, base_id):
+        """Products are loaded from the main process; workers need their prices anyway"""
+        rng = random.Random(f"{self.args.seed}:products")
+        category_sampler = ZipfSampler(len(CATEGORIES), 1.0)
+        prices = []
+        lines = []
+        for index in range(self.args.products):
+            product_id = base_id + index + 1
+            category = CATEGORIES[category_sampler.sample(rng)]
+            price = round(min(rng.lognormvariate(7.0, 1.2), 100000.0), 2)
+            prices.append(price)
+            lines.append(f"{product_id}\t{category.title()} Product {product_id}\t{price:.2f}\t"
+                         f"{category}\t{rng.randint(0, 1000)}\tGenerated {category} product\n")
+        copy_rows(cursor, 'products', ['id', 'name', 'price', 'category', 'stock', 'description'], lines)
+        return prices
+
+    def _run_parallel(self, func, ranges, config, prices, label):
+        started = time.time()
+        rows = 0
+        items = 0
+        with multiprocessing.Pool(self.args.workers, initializer=_init_worker,
+                                  initargs=(self.dsn, config, prices)) as pool:
+            for done, result in enumerate(pool.imap_unordered(func, ranges), start=1):
+                rows += result[1]
+                if len(result) > 2:
+                    items += result[2]
+                elapsed = time.time() - started
+                print(f"  {label}: chunk {done}/{len(ranges)} - {rows:,} rows"
+                      + (f", {items:,} items" if items else "")
+                      + f" ({rows / max(elapsed, 1e-9):,.0f} rows/s)", end='\r')
+        print()
+        return rows, items
+
+    def run(self):
+        args = self.args
+        started = time.time()
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = False
+
+        with conn.cursor() as cursor:
+            if args.truncate:
+                print("🧹 Truncating users, products, orders, order_items...")
+                cursor.execute("TRUNCATE order_items, orders, products, users RESTART IDENTITY CASCADE")
+            base_ids = self._max_ids(cursor)
+
+            print(f"📦 Loading {args.products:,} products...")
+            prices = self._load_products(cursor, base_ids['products'])
+        conn.commit()
+
+        config = {
+            'seed': args.seed,
+            'users': args.users,
+            'days': args.days,
+            'end_date': self.end_date,
+            'zipf_s': args.zipf_s,
+            'items_per_order': args.items_per_order,
+            'user_base': base_ids['users'],
+            'product_base': base_ids['products'],
+            'order_base': base_ids['orders'],
+            'item_base': base_ids['order_items'],
+        }
+
+        print(f"👤 Loading {args.users:,} users with {args.workers} workers...")
+        self._run_parallel(_load_users_chunk, chunk_ranges(args.users, args.chunk_size),
+                           config, prices, 'users')
+
+        print(f"🛒 Loading {args.orders:,} orders (zipf s={args.zipf_s})...")
+        _, items = self._run_parallel(_load_orders_chunk, chunk_ranges(args.orders, args.chunk_size),
+                                      config, prices, 'orders')
+
+        print("🔧 Resetting sequences and running ANALYZE...")
+        with conn.cursor() as cursor:
+            for table in ('users', 'products', 'orders', 'order_items'):
+                cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                               f"(SELECT COALESCE(MAX(id), 1) FROM {table}))")
+        conn.commit()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE users, products, orders, order_items")
+        conn.close()
+
+        print(f"✅ Done in {time.time() - started:.1f}s: {args.users:,} users, {args.products:,} products, "
+              f"{args.orders:,} orders, {items:,} order_items")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large synthetic dataset for the performance_test database")
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--products', type=int, default=10_000)
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    parser.add_argument('--items-per-order', type=int, default=3,
+                        help="mean items per order (uniform 1..2n-1)")
+    parser.add_argument('--zipf-s', type=float, default=1.1,
+                        help="Zipf exponent for user activity and product popularity")
+    parser.add_argument('--days', type=int, default=365, help="users.created_at spread before --end-date; orders follow signup")
+    parser.add_argument('--end-date', help="YYYY-MM-DD, defaults to today (fix it for reproducible runs)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--chunk-size', type=int, default=50_000, help=f"rows (users/orders) per COPY chunk, rounded up to a multiple of {RNG_BLOCK}")
+    parser.add_argument('--truncate', action='store_true', help="remove existing rows first")
+    parser.add_argument('--dsn', help="libpq connection string (defaults to DB_* environment variables)")
+    args = parser.parse_args()
+
+    if min(args.users, args.products, args.orders, args.items_per_order, args.workers, args.chunk_size) < 1:
+        parser.error("counts, --workers and --chunk-size must be positive")
+
+    DataGenerator(args).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -47,11 +47,20 @@ CREATE TABLE IF NOT EXISTS order_items (
 
 -- สร้าง Indexes สำหรับ performance
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
-CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders(user_id);
-CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
-CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id);
 CREATE INDEX IF NOT EXISTS idx_order_items_product_id ON order_items(product_id);
-CREATE INDEX IF NOT EXISTS idx_products_category ON products(category);
+
+-- Composite / covering indexes สำหรับ analytics ที่กรองด้วยช่วงเวลา, status และ category
+-- เช่น "completed orders ใน 7 วันล่าสุดของ electronics" จะอ่านเฉพาะช่วงที่เกี่ยวข้อง
+-- (แทน single-column indexes บน orders(status), order_items(order_id), products(category)
+-- ซึ่งเป็น prefix ของ indexes เหล่านี้)
+CREATE INDEX IF NOT EXISTS idx_orders_status_order_date ON orders(status, order_date) INCLUDE (id, user_id, total_amount);
+CREATE INDEX IF NOT EXISTS idx_orders_order_date ON orders(order_date) INCLUDE (id, user_id, status);
+CREATE INDEX IF NOT EXISTS idx_order_items_order_id_covering ON order_items(order_id) INCLUDE (product_id, quantity, price);
+CREATE INDEX IF NOT EXISTS idx_products_category_id ON products(category, id);
+
+-- Latest orders ต่อ user (GET /users/{id}/orders และ /users?include=orders)
+-- ใช้แทน orders(user_id) สำหรับ lookup ตาม user_id ด้วย
+CREATE INDEX IF NOT EXISTS idx_orders_user_id_order_date ON orders(user_id, order_date DESC, id DESC);
 
 -- Insert sample data
 -- Users
@@ -130,4 +139,41 @@ CREATE TRIGGER update_products_updated_at BEFORE UPDATE ON products
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
     
 CREATE TRIGGER update_orders_updated_at BEFORE UPDATE ON orders
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column(); 
\ No newline at end of file
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column(); 
+-- Per-table change counters สำหรับ ETag / conditional GET
+-- ทุก statement ที่แก้ไข table จะเพิ่ม version ภายใน transaction เดียวกัน จึงเห็น version ใหม่พร้อมกับข้อมูลที่ commit แล้วเท่านั้น
+-- counter ของแต่ละ table แบ่งเป็น 16 shards ตาม backend pid เพื่อไม่ให้ writers ทุกตัวรอ row lock เดียวกันจน commit;
+-- version ของ table = SUM(version) ของทุก shard
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(64) NOT NULL,
+    shard INTEGER NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (table_name, shard)
+) WITH (fillfactor = 50);
+
+INSERT INTO table_versions (table_name, shard)
+SELECT table_name, shard
+FROM unnest(ARRAY['users', 'products', 'orders', 'order_items']) AS table_name,
+     generate_series(0, 15) AS shard
+ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_table_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE table_versions SET version = version + 1
+    WHERE table_name = TG_TABLE_NAME AND shard = pg_backend_pid() % 16;
+    RETURN NULL;
+END;
+$$ language plpgsql;
+
+CREATE TRIGGER users_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON users
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+CREATE TRIGGER products_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON products
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+CREATE TRIGGER orders_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON orders
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+CREATE TRIGGER order_items_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON order_items
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
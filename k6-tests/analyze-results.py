@@ -45,7 +45,8 @@ class APIPerformanceAnalyzer:
             "benchmark-comparison-results-*.json",
             "quick-stress-*.json",
             "full-stress-*.json",
-            "spike-test-*.json"
+            "spike-test-*.json",
+            "open-model-*.json"
         ]
         
         files = []
@@ -213,8 +214,10 @@ class APIPerformanceAnalyzer:
    • Requests: {data['requests']:,}
    • Avg Response: {data['avgResponseTime']:.2f}ms
    • P95 Response: {data['p95ResponseTime']:.2f}ms
-   • Error Rate: {data['errorRate']:.2f}%
 """
+            if 'p99ResponseTime' in data:
+                report += f"   • P99 Response: {data['p99ResponseTime']:.2f}ms\n"
+            report += f"   • Error Rate: {data['errorRate']:.2f}%\n"
         
         # Performance Analysis
         fastest = sorted_apis[0]
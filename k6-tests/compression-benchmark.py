@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Response Compression Benchmark
+เปรียบเทียบ gzip / brotli / zstd แต่ละ level: ขนาด response, bytes/sec ที่ส่งออก และ CPU ต่อ response
+
+Bodies are fetched uncompressed from the python-api endpoints (or synthesized with
+--synthetic when the API is not running) and compressed repeatedly with every option,
+measuring CPU time with time.process_time().
+
+Usage:
+  python compression-benchmark.py
+  python compression-benchmark.py --base-url http://localhost:8000 --rate 500
+  python compression-benchmark.py --synthetic --rows 2000
+"""
+
+import argparse
+import gzip
+import json
+import time
+import urllib.request
+from datetime import datetime, timedelta
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ENDPOINTS = [
+    '/api/v1/analytics',
+    '/api/v1/orders-with-users?limit=100&offset=0',
+    '/api/v1/user-order-summary?limit=100&offset=0',
+    '/api/v1/users?limit=100&offset=0',
+]
+
+
+def compression_options():
+    options = [('identity', lambda data: data)]
+    for level in (1, 6, 9):
+        options.append((f'gzip-{level}', lambda data, level=level: gzip.compress(data, compresslevel=level, mtime=0)))
+    if brotli is not None:
+        for quality in (1, 4, 11):
+            options.append((f'br-{quality}', lambda data, quality=quality: brotli.compress(data, quality=quality)))
+    if zstandard is not None:
+        for level in (1, 3, 10):
+            compressor = zstandard.ZstdCompressor(level=level)
+            options.append((f'zstd-{level}', compressor.compress))
+    return options
+
+
+def fetch_bodies(base_url):
+    bodies = {}
+    for path in ENDPOINTS:
+        request = urllib.request.Request(base_url + path, headers={'Accept-Encoding': 'identity'})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                bodies[path] = response.read()
+        except Exception as e:
+            print(f"⚠️ Could not fetch {path}: {e}")
+    return bodies
+
+
+def synthetic_bodies(rows):
+    start = datetime(2024, 1, 1)
+    orders = [{
+        'order_id': i, 'user_id': i % 997, 'user_name': f'User {i % 997}',
+        'user_email': f'user{i % 997}@bench.example.com', 'user_city': 'Bangkok',
+        'total_amount': f'{(i * 37) % 50000}.00', 'status': 'completed',
+        'order_date': (start + timedelta(minutes=i)).isoformat(), 'item_count': i % 5 + 1,
+    } for i in range(rows)]
+    return {'synthetic orders-with-users': json.dumps(orders).encode()}
+
+
+def benchmark(body, compress, min_seconds):
+    """Returns (compressed size, CPU seconds per call)"""
+    compressed = compress(body)
+    iterations = 0
+    started = time.process_time()
+    while True:
+        compress(body)
+        iterations += 1
+        elapsed = time.process_time() - started
+        if elapsed >= min_seconds:
+            return len(compressed), elapsed / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare response compression options")
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--synthetic', action='store_true', help="use generated JSON instead of the live API")
+    parser.add_argument('--rows', type=int, default=1000, help="rows in the synthetic body")
+    parser.add_argument('--rate', type=float, default=200, help="responses/sec used for the bytes/sec and CPU columns")
+    parser.add_argument('--min-seconds', type=float, default=0.5, help="CPU time spent per measurement")
+    args = parser.parse_args()
+
+    bodies = synthetic_bodies(args.rows) if args.synthetic else fetch_bodies(args.base_url)
+    if not bodies:
+        print("❌ No response bodies to benchmark (start the API or use --synthetic)")
+        return
+    if brotli is None or zstandard is None:
+        print("💡 Install brotli and zstandard to include br / zstd options")
+
+    for name, body in bodies.items():
+        print(f"\n📄 {name}: {len(body):,} bytes uncompressed")
+        print(f"   {'option':<10} {'bytes':>10} {'ratio':>7} {'CPU ms/resp':>12} {'MB/s/core':>10} "
+              f"{'KB/s @ rate':>12} {'CPU % @ rate':>12}")
+        for option, compress in compression_options():
+            size, cpu_seconds = benchmark(body, compress, args.min_seconds)
+            throughput = len(body) / cpu_seconds / 1_000_000 if cpu_seconds else float('inf')
+            print(f"   {option:<10} {size:>10,} {len(body) / size:>7.2f} {cpu_seconds * 1000:>12.3f} "
+                  f"{throughput:>10.1f} {size * args.rate / 1024:>12,.1f} {cpu_seconds * args.rate * 100:>11.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Open-Model Load Generator
+ยิง request ตาม arrival rate ที่กำหนด (open model) แทน VU + sleep (closed model) ของ k6
+
+Requests are launched at their scheduled send time regardless of how many are still
+in flight, and latency is measured from the *intended* send time. A slow server
+therefore shows up in the percentiles instead of silently lowering the request rate
+(coordinated omission).
+
+Usage:
+  python open-model-load.py --rate 100 --duration 60s
+  python open-model-load.py --stages 50:30s,200:60s,50:60s --scenario mixed
+  python open-model-load.py --help
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+# Request mixes per scenario: (method, path template, weight). {user_id} is replaced
+# by a random id between 1 and --max-user-id; POST/PUT requests get a generated user body.
+SCENARIOS = {
+    'health': [
+        ('GET', '/api/v1/health', 1),
+    ],
+    'users': [
+        ('GET', '/api/v1/users?limit=10&offset=0', 3),
+        ('GET', '/api/v1/users/{user_id}', 7),
+    ],
+    'analytics': [
+        ('GET', '/api/v1/analytics', 2),
+        ('GET', '/api/v1/orders-with-users?limit=10&offset=0', 1),
+        ('GET', '/api/v1/user-order-summary?limit=10&offset=0', 1),
+    ],
+    'writes': [
+        ('POST', '/api/v1/users', 1),
+        ('PUT', '/api/v1/users/{user_id}', 1),
+    ],
+    'mixed': [
+        ('GET', '/api/v1/health', 1),
+        ('GET', '/api/v1/users?limit=10&offset=0', 3),
+        ('GET', '/api/v1/users/{user_id}', 4),
+        ('GET', '/api/v1/analytics', 1),
+        ('GET', '/api/v1/orders-with-users?limit=10&offset=0', 1),
+    ],
+}
+CITIES = ['Bangkok', 'Chiang Mai', 'Phuket', 'Pattaya', 'Khon Kaen']
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of latencies in microseconds.
+
+    Values below 2**SUB_BITS are recorded exactly; larger values keep SUB_BITS - 1
+    significant bits, i.e. a relative error below 0.1%.
+    """
+
+    SUB_BITS = 11
+
+    def __init__(self):
+        self.counts = {}
+        self.total_count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    def _bucket(self, value):
+        if value < (1 << self.SUB_BITS):
+            return value
+        shift = value.bit_length() - self.SUB_BITS
+        return (shift << (self.SUB_BITS - 1)) + (value >> shift)
+
+    def _bucket_value(self, bucket):
+        if bucket < (1 << self.SUB_BITS):
+            return bucket
+        shift = (bucket >> (self.SUB_BITS - 1)) - 1
+        mantissa = bucket - (shift << (self.SUB_BITS - 1))
+        # Midpoint of the bucket's value range
+        return (mantissa << shift) + (1 << (shift - 1))
+
+    def record(self, value_us):
+        value_us = max(0, int(value_us))
+        bucket = self._bucket(value_us)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total_count += 1
+        self.total_us += value_us
+        self.max_us = max(self.max_us, value_us)
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+
+    def merge(self, other):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.total_count += other.total_count
+        self.total_us += other.total_us
+        self.max_us = max(self.max_us, other.max_us)
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+
+    def percentile(self, percentile):
+        if not self.total_count:
+            return 0
+        target = max(1, int(round(percentile / 100.0 * self.total_count)))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(self._bucket_value(bucket), self.max_us)
+        return self.max_us
+
+    def mean(self):
+        return self.total_us / self.total_count if self.total_count else 0
+
+    def summary_ms(self):
+        return {
+            'count': self.total_count,
+            'min': (self.min_us or 0) / 1000,
+            'avg': self.mean() / 1000,
+            'p50': self.percentile(50) / 1000,
+            'p90': self.percentile(90) / 1000,
+            'p95': self.percentile(95) / 1000,
+            'p99': self.percentile(99) / 1000,
+            'p99.9': self.percentile(99.9) / 1000,
+            'max': self.max_us / 1000,
+        }
+
+    def distribution_ms(self):
+        """Percentile distribution in the spirit of HdrHistogram's output"""
+        percentiles = [0, 10, 20, 30, 40, 50, 60, 70, 75, 80, 85, 90, 95, 97.5, 99, 99.5, 99.9, 99.99, 100]
+        return [{'percentile': p, 'valueMs': self.percentile(p) / 1000} for p in percentiles]
+
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 client connection on asyncio streams"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def request(self, method, path, body=None):
+        headers = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                   "Connection: keep-alive", "Accept: application/json"]
+        payload = b""
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers += ["Content-Type: application/json", f"Content-Length: {len(payload)}"]
+        self.writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + payload)
+        await self.writer.drain()
+
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode('latin-1').split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        response_headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            size = 0
+            while True:
+                chunk_size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if chunk_size == 0:
+                    await self.reader.readuntil(b"\r\n")
+                    break
+                await self.reader.readexactly(chunk_size + 2)
+                size += chunk_size
+        elif 'content-length' in response_headers:
+            size = int(response_headers['content-length'])
+            await self.reader.readexactly(size)
+        elif status in (204, 304) or method == 'HEAD':
+            size = 0
+        else:
+            size = len(await self.reader.read())
+            response_headers['connection'] = 'close'
+
+        keep_alive = response_headers.get('connection', '').lower() != 'close'
+        return status, size, keep_alive
+
+
+class ConnectionPool:
+    """Shared pool of keep-alive connections; waiting for a connection counts as latency"""
+
+    def __init__(self, host, port, size):
+        self.host = host
+        self.port = port
+        self.size = size
+        self.idle = []
+        self.opened = 0
+        self.available = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.available:
+            while not self.idle and self.opened >= self.size:
+                await self.available.wait()
+            if self.idle:
+                return self.idle.pop()
+            self.opened += 1
+        connection = HttpConnection(self.host, self.port)
+        try:
+            await connection.open()
+        except BaseException:
+            # Includes the CancelledError of a --timeout during connect: give the slot back
+            await self.release(connection, reusable=False)
+            raise
+        return connection
+
+    async def release(self, connection, reusable=True):
+        async with self.available:
+            if reusable:
+                self.idle.append(connection)
+            else:
+                connection.close()
+                self.opened -= 1
+            self.available.notify()
+
+    def close(self):
+        for connection in self.idle:
+            connection.close()
+        self.idle = []
+
+
+def parse_duration(value):
+    value = value.strip().lower()
+    for suffix, factor in (('ms', 0.001), ('s', 1), ('m', 60), ('h', 3600)):
+        if value.endswith(suffix) and value[:-len(suffix)].replace('.', '', 1).isdigit():
+            return float(value[:-len(suffix)]) * factor
+    return float(value)
+
+
+def parse_stages(value):
+    """'50:30s,200:1m' -> [(50.0, 30.0), (200.0, 60.0)] as (requests/sec, seconds)"""
+    stages = []
+    for part in value.split(','):
+        rate, duration = part.split(':')
+        stages.append((float(rate), parse_duration(duration)))
+    return stages
+
+
+def intended_send_times(stages):
+    """Yields offsets (seconds from test start) at which each request should be sent"""
+    stage_start = 0.0
+    for rate, duration in stages:
+        if rate > 0:
+            interval = 1.0 / rate
+            for index in range(int(rate * duration)):
+                yield stage_start + index * interval
+        stage_start += duration
+
+
+class OpenModelLoadGenerator:
+    def __init__(self, args):
+        self.args = args
+        target = urlsplit(args.base_url)
+        self.host = target.hostname
+        self.port = target.port or 80
+        self.stages = parse_stages(args.stages) if args.stages else [(args.rate, parse_duration(args.duration))]
+        self.requests = SCENARIOS[args.scenario]
+        self.weights = [weight for _, _, weight in self.requests]
+        self.rng = random.Random(args.seed)
+        # Keeps generated emails unique across runs against the same database
+        self.run_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{args.seed}"
+        self.sequence = 0
+
+        self.histogram = LatencyHistogram()
+        # 2xx/3xx only: fast 503s from load shedding would otherwise make the server look faster
+        self.success_histogram = LatencyHistogram()
+        self.shed = 0
+        self.endpoint_histograms = {}
+        self.status_counts = {}
+        self.errors = 0
+        self.dropped = 0
+        self.bytes_received = 0
+        self.in_flight = 0
+        self.start = None
+        self.timeline = {}
+
+    def _next_request(self):
+        method, template, _ = self.rng.choices(self.requests, weights=self.weights)[0]
+        path = template.replace('{user_id}', str(self.rng.randint(1, self.args.max_user_id)))
+        body = None
+        if method == 'POST':
+            self.sequence += 1
+            body = {'name': f"Load User {self.sequence}",
+                    'email': f"load-{self.run_id}-{self.sequence}@example.com",
+                    'age': self.rng.randint(18, 70), 'city': self.rng.choice(CITIES)}
+        elif method == 'PUT':
+            body = {'age': self.rng.randint(18, 70), 'city': self.rng.choice(CITIES)}
+        return method, template, path, body
+
+    def _second(self, intended):
+        # Per-second buckets by intended send time, for the timeline and recovery time
+        return self.timeline.setdefault(int(intended - self.start), {
+            'histogram': LatencyHistogram(), 'success': LatencyHistogram(), 'errors': 0, 'shed': 0, 'dropped': 0})
+
+    def _record_dropped(self, intended):
+        """Requests never sent (over --max-in-flight) have no latency: they are counted as failures
+        but kept out of the histograms, where ~0us entries would pull the percentiles down"""
+        second = self._second(intended)
+        self.dropped += 1
+        self.errors += 1
+        second['errors'] += 1
+        second['dropped'] += 1
+        self.status_counts['dropped'] = self.status_counts.get('dropped', 0) + 1
+
+    def _record(self, template, intended, latency_us, status=None, size=0):
+        self.histogram.record(latency_us)
+        second = self._second(intended)
+        second['histogram'].record(latency_us)
+        self.endpoint_histograms.setdefault(template, LatencyHistogram()).record(latency_us)
+        key = str(status) if status is not None else 'error'
+        self.status_counts[key] = self.status_counts.get(key, 0) + 1
+        self.bytes_received += size
+        if status is None or status >= 400:
+            self.errors += 1
+            second['errors'] += 1
+        else:
+            self.success_histogram.record(latency_us)
+            second['success'].record(latency_us)
+        if status == 503:
+            self.shed += 1
+            second['shed'] += 1
+
+    async def _send(self, pool, method, template, path, body, intended):
+        status = None
+        size = 0
+        connection = None
+        try:
+            connection = await asyncio.wait_for(pool.acquire(), self.args.timeout)
+            status, size, keep_alive = await asyncio.wait_for(
+                connection.request(method, path, body), self.args.timeout)
+            await pool.release(connection, reusable=keep_alive)
+        except Exception:
+            if connection is not None:
+                await pool.release(connection, reusable=False)
+        finally:
+            self.in_flight -= 1
+        # Latency from the intended send time, not from when the request actually went out
+        self._record(template, intended, (time.perf_counter() - intended) * 1_000_000, status, size)
+
+    async def run(self):
+        pool = ConnectionPool(self.host, self.port, self.args.connections)
+        tasks = set()
+        start = self.start = time.perf_counter() + 0.1
+
+        for offset in intended_send_times(self.stages):
+            intended = start + offset
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            method, template, path, body = self._next_request()
+            if self.in_flight >= self.args.max_in_flight:
+                # Open model: never slow the schedule down, count the request as lost
+                self._record_dropped(intended)
+                continue
+
+            self.in_flight += 1
+            task = asyncio.create_task(self._send(pool, method, template, path, body, intended))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        pool.close()
+        self.elapsed = time.perf_counter() - start
+
+    def timeline_summary(self):
+        seconds = []
+        for second in sorted(self.timeline):
+            bucket = self.timeline[second]
+            latency = bucket['histogram'].summary_ms()
+            success = bucket['success'].summary_ms()
+            seconds.append({
+                'second': second,
+                'requests': latency['count'] + bucket['dropped'],
+                'errors': bucket['errors'],
+                'shed': bucket['shed'],
+                'dropped': bucket['dropped'],
+                'p50': latency['p50'],
+                'p99': latency['p99'],
+                'successP99': success['p99'],
+            })
+        return seconds
+
+    def recovery_time(self, seconds):
+        """Seconds after the peak stage ends until every following second is back within the
+        --recovery-p99-ms (successful requests) / --recovery-error-rate thresholds (None if it never recovers)"""
+        if len(self.stages) < 2:
+            return None
+        peak = max(range(len(self.stages)), key=lambda index: self.stages[index][0])
+        peak_end = sum(duration for _, duration in self.stages[:peak + 1])
+        if peak_end >= sum(duration for _, duration in self.stages):
+            return None
+
+        recovered_at = None
+        for second in seconds:
+            if second['second'] < peak_end:
+                continue
+            healthy = (second['successP99'] <= self.args.recovery_p99_ms and
+                       second['errors'] <= second['requests'] * self.args.recovery_error_rate / 100)
+            if not healthy:
+                recovered_at = None
+            elif recovered_at is None:
+                recovered_at = second['second']
+        return recovered_at - peak_end if recovered_at is not None else None
+
+    def results(self):
+        summary = self.histogram.summary_ms()
+        total = self.histogram.total_count + self.dropped
+        timeline = self.timeline_summary()
+        return {
+            # Same shape as benchmark-compare.js so analyze-results.py can read it
+            'apiComparison': {
+                self.args.api: {
+                    'requests': total,
+                    'avgResponseTime': summary['avg'],
+                    'p95ResponseTime': summary['p95'],
+                    'p99ResponseTime': summary['p99'],
+                    'errorRate': (self.errors / total * 100) if total else 0,
+                }
+            },
+            'openModel': {
+                'baseUrl': self.args.base_url,
+                'scenario': self.args.scenario,
+                'stages': [{'rate': rate, 'durationSec': duration} for rate, duration in self.stages],
+                'connections': self.args.connections,
+                'elapsedSec': self.elapsed,
+                'achievedRate': self.histogram.total_count / self.elapsed if self.elapsed else 0,
+                'dropped': self.dropped,
+                'bytesReceived': self.bytes_received,
+                'statusCounts': self.status_counts,
+                'latencyMs': summary,
+                'successLatencyMs': self.success_histogram.summary_ms(),
+                'shed': self.shed,
+                'shedRate': (self.shed / total * 100) if total else 0,
+                'latencyDistribution': self.histogram.distribution_ms(),
+                'endpoints': {template: histogram.summary_ms()
+                              for template, histogram in self.endpoint_histograms.items()},
+                'timeline': timeline,
+                'recoverySec': self.recovery_time(timeline),
+            },
+        }
+
+
+def print_summary(results, verbose_timeline=False):
+    model = results['openModel']
+    latency = model['latencyMs']
+    print(f"\n📊 {latency['count']:,} requests in {model['elapsedSec']:.1f}s "
+          f"({model['achievedRate']:.1f} req/s), dropped: {model['dropped']:,}")
+    print(f"   status: {model['statusCounts']}")
+    print(f"   latency (from intended send time): p50 {latency['p50']:.2f}ms  p90 {latency['p90']:.2f}ms  "
+          f"p99 {latency['p99']:.2f}ms  p99.9 {latency['p99.9']:.2f}ms  max {latency['max']:.2f}ms")
+    success = model['successLatencyMs']
+    print(f"   successful (2xx/3xx) only: {success['count']:,} req, p50 {success['p50']:.2f}ms  "
+          f"p99 {success['p99']:.2f}ms  max {success['max']:.2f}ms; shed (503): {model['shed']:,} "
+          f"({model['shedRate']:.1f}%)")
+    for template, endpoint in model['endpoints'].items():
+        print(f"   {template}: {endpoint['count']:,} req, p50 {endpoint['p50']:.2f}ms, p99 {endpoint['p99']:.2f}ms")
+
+    if verbose_timeline:
+        print("   second  requests  errors  shed(503)   p50 ms    p99 ms  2xx p99 ms")
+        for second in model['timeline']:
+            print(f"   {second['second']:>6}  {second['requests']:>8}  {second['errors']:>6}  {second['shed']:>9}  "
+                  f"{second['p50']:>8.2f}  {second['p99']:>8.2f}  {second['successP99']:>10.2f}")
+    if len(model['stages']) > 1:
+        recovery = model['recoverySec']
+        print(f"   recovery after peak stage: {f'{recovery:.0f}s' if recovery is not None else 'not recovered'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-model (constant arrival rate) load generator")
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--api', default='python', help="API name used in the result file")
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='mixed')
+    parser.add_argument('--rate', type=float, default=100, help="requests/sec for a constant schedule")
+    parser.add_argument('--duration', default='60s')
+    parser.add_argument('--stages', help="stepped schedule 'rate:duration,...' e.g. 50:30s,200:1m")
+    parser.add_argument('--connections', type=int, default=100, help="shared connection pool size")
+    parser.add_argument('--max-in-flight', type=int, default=10000)
+    parser.add_argument('--timeout', type=float, default=30.0, help="seconds before a request counts as failed")
+    parser.add_argument('--max-user-id', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--results-dir', default='stress-test-results')
+    parser.add_argument('--timeline', action='store_true', help="print per-second request counts and latency")
+    parser.add_argument('--recovery-p99-ms', type=float, default=500,
+                        help="p99 a second must stay under to count as recovered after the peak stage")
+    parser.add_argument('--recovery-error-rate', type=float, default=1.0,
+                        help="error percentage a second must stay under to count as recovered")
+    args = parser.parse_args()
+
+    generator = OpenModelLoadGenerator(args)
+    print(f"🚀 Open-model load: {args.scenario} scenario against {args.base_url}")
+    for rate, duration in generator.stages:
+        print(f"   {rate:.0f} req/s for {duration:.0f}s")
+
+    asyncio.run(generator.run())
+    results = generator.results()
+    print_summary(results, args.timeline)
+
+    results_dir = Path(args.results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    output_file = results_dir / f"open-model-{args.api}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"📄 Results saved to: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
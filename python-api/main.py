@@ -1,7 +1,14 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from routers import user_router, analytics_router
 from models.database import engine, Base
+from models.query_budget import QueryBudgetExceeded
+from services.group_commit import GROUP_COMMIT_ENABLED, group_commit_writer
+from services.refresh_worker import refresh_worker
+from services.change_feed import CHANGE_FEED_ENABLED, change_feed
+from middleware.cors import FastPathCORSMiddleware
+from middleware.compression import COMPRESSION_ENABLED, CompressionMiddleware
+from middleware.concurrency import CONCURRENCY_LIMIT_ENABLED, ConcurrencyLimitMiddleware, mark_not_overload
 import uvicorn
 
 # Create tables
@@ -13,19 +20,67 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Add CORS middleware
+# Add response compression (gzip/br/zstd, see middleware/compression.py for settings)
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Adaptive concurrency limit with priority classes and fast 503s (see middleware/concurrency.py);
+# sheds load before compression or any endpoint work is done
+if CONCURRENCY_LIMIT_ENABLED:
+    app.add_middleware(ConcurrencyLimitMiddleware)
+
+# Add CORS middleware (same-origin requests skip the CORS checks); outermost, so preflights are
+# answered before the limiter and shed 503s still carry CORS headers and a readable Retry-After
 app.add_middleware(
-    CORSMiddleware,
+    FastPathCORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
 # Include routers
 app.include_router(user_router.router, prefix="/api/v1", tags=["users"])
 app.include_router(analytics_router.router, prefix="/api/v1", tags=["analytics"])
 
+@app.exception_handler(QueryBudgetExceeded)
+async def query_budget_exceeded_handler(request: Request, exc: QueryBudgetExceeded):
+    # A wasteful endpoint, not an overloaded server: don't let it shrink the concurrency limit
+    mark_not_overload(request.scope)
+    return JSONResponse(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        content={"detail": f"Query budget exceeded: {exc}"}
+    )
+
+@app.on_event("startup")
+async def start_group_commit_writer():
+    if GROUP_COMMIT_ENABLED:
+        await group_commit_writer.start()
+
+@app.on_event("shutdown")
+async def stop_group_commit_writer():
+    await group_commit_writer.stop()
+
+@app.on_event("startup")
+async def start_refresh_worker():
+    await refresh_worker.start()
+
+@app.on_event("shutdown")
+async def stop_refresh_worker():
+    await refresh_worker.stop()
+
+@app.on_event("startup")
+async def start_change_feed():
+    if CHANGE_FEED_ENABLED:
+        # Writes from any service invalidate cached analytics right away instead of at the next version poll
+        change_feed.subscribe(lambda changes: refresh_worker.invalidate(tables=list(changes)))
+        await change_feed.start()
+
+@app.on_event("shutdown")
+async def stop_change_feed():
+    await change_feed.stop()
+
 @app.get("/")
 async def root():
     return {"message": "Python API is running", "service": "python-api"}
@@ -0,0 +1,272 @@
+import gzip
+import os
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Optional codecs: only offered when the package is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compression configuration
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_ALGORITHMS = [a.strip() for a in os.getenv("COMPRESSION_ALGORITHMS", "gzip").split(",") if a.strip()]
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))       # bytes; smaller bodies are sent as-is
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", "256"))    # compressed bodies kept per ETag
+# Streaming responses: flush compressed output once this many input bytes or this much time has accumulated
+COMPRESSION_STREAM_FLUSH_SIZE = int(os.getenv("COMPRESSION_STREAM_FLUSH_SIZE", str(16 * 1024)))
+COMPRESSION_STREAM_FLUSH_MS = float(os.getenv("COMPRESSION_STREAM_FLUSH_MS", "100"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+# Bodies above this size are compressed in a worker thread instead of on the event loop
+THREAD_COMPRESS_SIZE = 64 * 1024
+MAX_CACHED_BODY_SIZE = 1024 * 1024
+
+class Codec:
+    """One content-coding: a one-shot compress function and a streaming compressor factory.
+
+    Streaming compressors expose compress(data) -> bytes (whatever output is ready, unflushed),
+    flush() -> bytes (so the client can decode what it has received so far) and finish() -> bytes.
+    """
+
+    def __init__(self, name: str, compress: Callable[[bytes], bytes], streaming: Callable[[], "object"]):
+        self.name = name
+        self.compress = compress
+        self.streaming = streaming
+
+class _ZlibStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+class _ZstdStream:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+def build_codecs(algorithms: List[str], gzip_level: int = 6, brotli_quality: int = 4,
+                 zstd_level: int = 3) -> Dict[str, Codec]:
+    """Codecs for the requested algorithms, in server preference order, skipping unavailable ones"""
+    codecs: Dict[str, Codec] = {}
+    for name in algorithms:
+        if name == "gzip":
+            codecs[name] = Codec(name, lambda data: gzip.compress(data, compresslevel=gzip_level, mtime=0),
+                                 lambda: _ZlibStream(gzip_level))
+        elif name == "br" and brotli is not None:
+            codecs[name] = Codec(name, lambda data: brotli.compress(data, quality=brotli_quality),
+                                 lambda: _BrotliStream(brotli_quality))
+        elif name == "zstd" and zstandard is not None:
+            compressor = zstandard.ZstdCompressor(level=zstd_level)
+            codecs[name] = Codec(name, compressor.compress, lambda: _ZstdStream(zstd_level))
+    return codecs
+
+def negotiate(accept_encoding: str, codecs: Dict[str, Codec]) -> Optional[Codec]:
+    """Pick the first server-preferred codec the client accepts with q > 0"""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        quality = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name] = quality
+
+    for name, codec in codecs.items():
+        if accepted.get(name, accepted.get("*", 0.0)) > 0:
+            return codec
+    return None
+
+class CompressionMiddleware:
+    """Compresses compressible responses with gzip / brotli / zstd.
+
+    Bodies smaller than `minimum_size` are sent uncompressed. Compressed bodies of responses that
+    carry an ETag are kept in a small LRU cache, so repeated requests for an unchanged resource
+    skip the compression work.
+    """
+
+    def __init__(self, app: ASGIApp, algorithms: Optional[List[str]] = None,
+                 minimum_size: int = COMPRESSION_MIN_SIZE, gzip_level: int = COMPRESSION_GZIP_LEVEL,
+                 brotli_quality: int = COMPRESSION_BROTLI_QUALITY, zstd_level: int = COMPRESSION_ZSTD_LEVEL,
+                 cache_size: int = COMPRESSION_CACHE_SIZE, stream_flush_size: int = COMPRESSION_STREAM_FLUSH_SIZE,
+                 stream_flush_ms: float = COMPRESSION_STREAM_FLUSH_MS):
+        self.app = app
+        self.codecs = build_codecs(algorithms or COMPRESSION_ALGORITHMS, gzip_level, brotli_quality, zstd_level)
+        self.minimum_size = minimum_size
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self.stream_flush_size = stream_flush_size
+        self.stream_flush_interval = stream_flush_ms / 1000
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.codecs:
+            await self.app(scope, receive, send)
+            return
+
+        codec = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.codecs)
+        if codec is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, codec, send)
+        await self.app(scope, receive, responder.send_message)
+
+    def cached(self, etag: str, codec: Codec) -> Optional[bytes]:
+        body = self.cache.get((etag, codec.name))
+        if body is not None:
+            self.cache.move_to_end((etag, codec.name))
+        return body
+
+    def store(self, etag: str, codec: Codec, body: bytes) -> None:
+        if self.cache_size <= 0 or len(body) > MAX_CACHED_BODY_SIZE:
+            return
+        self.cache[(etag, codec.name)] = body
+        self.cache.move_to_end((etag, codec.name))
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, codec: Codec, send: Send):
+        self.middleware = middleware
+        self.codec = codec
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.buffer = b""
+        self.stream = None
+        self.unflushed = 0        # input bytes fed to the stream since its last flush
+        self.flushed_at = 0.0
+
+    async def send_message(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            compressible = content_type.startswith(COMPRESSIBLE_TYPES)
+            if compressible:
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+            self.passthrough = (not compressible or "content-encoding" in headers
+                                or message["status"] in (204, 304))
+            if self.passthrough:
+                await self._send(message)
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is not None:
+            await self._send_stream_chunk(body, more_body)
+            return
+
+        self.buffer += body
+        if not more_body:
+            await self._send_complete(self.buffer)
+        elif len(self.buffer) >= self.middleware.minimum_size:
+            await self._start_stream()
+
+    async def _send_complete(self, body: bytes) -> None:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        if len(body) < self.middleware.minimum_size:
+            await self._send(self.start_message)
+            await self._send({"type": "http.response.body", "body": body})
+            return
+
+        etag = headers.get("etag")
+        compressed = self.middleware.cached(etag, self.codec) if etag else None
+        if compressed is None:
+            if len(body) >= THREAD_COMPRESS_SIZE:
+                compressed = await anyio.to_thread.run_sync(self.codec.compress, body)
+            else:
+                compressed = self.codec.compress(body)
+            if etag and "no-store" not in headers.get("cache-control", ""):
+                self.middleware.store(etag, self.codec, compressed)
+
+        headers["Content-Encoding"] = self.codec.name
+        headers["Content-Length"] = str(len(compressed))
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": compressed})
+
+    async def _start_stream(self) -> None:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.codec.name
+        if "content-length" in headers:
+            del headers["content-length"]
+        self.stream = self.codec.streaming()
+        await self._send(self.start_message)
+        # The first chunk is flushed right away so the client starts receiving early
+        await self._send({"type": "http.response.body", "body": self.stream.compress(self.buffer) + self.stream.flush(),
+                          "more_body": True})
+        self.buffer = b""
+        self.flushed_at = time.monotonic()
+
+    async def _send_stream_chunk(self, body: bytes, more_body: bool) -> None:
+        # Small chunks (e.g. one JSON item each) are fed to the compressor without flushing: a sync
+        # flush per chunk costs several bytes of framing and resets the block, so output is only
+        # flushed every stream_flush_size input bytes or stream_flush_interval seconds
+        chunk = self.stream.compress(body) if body else b""
+        self.unflushed += len(body)
+        if not more_body:
+            chunk += self.stream.finish()
+        elif self.unflushed and (self.unflushed >= self.middleware.stream_flush_size or
+                                 time.monotonic() - self.flushed_at >= self.middleware.stream_flush_interval):
+            chunk += self.stream.flush()
+            self.unflushed = 0
+            self.flushed_at = time.monotonic()
+        if chunk or not more_body:
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
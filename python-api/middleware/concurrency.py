@@ -0,0 +1,223 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Concurrency limiter configuration
+CONCURRENCY_LIMIT_ENABLED = os.getenv("CONCURRENCY_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+CONCURRENCY_INITIAL_LIMIT = int(os.getenv("CONCURRENCY_INITIAL_LIMIT", "20"))
+CONCURRENCY_MIN_LIMIT = int(os.getenv("CONCURRENCY_MIN_LIMIT", "4"))
+CONCURRENCY_MAX_LIMIT = int(os.getenv("CONCURRENCY_MAX_LIMIT", "50"))            # = pool_size + max_overflow
+CONCURRENCY_TOLERANCE = float(os.getenv("CONCURRENCY_TOLERANCE", "2.0"))         # latency ที่ยอมให้สูงกว่า baseline กี่เท่า
+CONCURRENCY_SMOOTHING = float(os.getenv("CONCURRENCY_SMOOTHING", "0.2"))
+CONCURRENCY_MAX_QUEUE = int(os.getenv("CONCURRENCY_MAX_QUEUE", "100"))           # requests ที่รอได้ต่อ priority class
+CONCURRENCY_RETRY_AFTER = int(os.getenv("CONCURRENCY_RETRY_AFTER", "1"))         # วินาที ใน Retry-After ของ 503
+
+# Priority classes, lowest number first. Critical requests are never limited or queued.
+CRITICAL, HIGH, NORMAL, LOW = 0, 1, 2, 3
+PRIORITY_NAMES = {CRITICAL: "critical", HIGH: "high", NORMAL: "normal", LOW: "low"}
+
+# How long a request of each class may wait for a slot before it is shed (ms)
+QUEUE_TIMEOUT_MS = {
+    HIGH: float(os.getenv("CONCURRENCY_QUEUE_TIMEOUT_HIGH_MS", "1000")),
+    NORMAL: float(os.getenv("CONCURRENCY_QUEUE_TIMEOUT_NORMAL_MS", "500")),
+    LOW: float(os.getenv("CONCURRENCY_QUEUE_TIMEOUT_LOW_MS", "200")),
+}
+
+# (method or "*", path prefix, class); the first match wins, anything else is NORMAL
+PRIORITY_RULES: List[Tuple[str, str, int]] = [
+    ("*", "/api/v1/health", CRITICAL),
+    ("GET", "/api/v1/users", HIGH),
+    ("GET", "/api/v1/analytics", LOW),
+    ("GET", "/api/v1/orders-with-users", LOW),
+    ("GET", "/api/v1/user-order-summary", LOW),
+]
+
+def classify(method: str, path: str) -> int:
+    # CORS preflights are answered without touching the app or the database
+    if path == "/" or method == "OPTIONS":
+        return CRITICAL
+    for rule_method, prefix, priority in PRIORITY_RULES:
+        if (rule_method == "*" or rule_method == method) and path.startswith(prefix):
+            return priority
+    return NORMAL
+
+def mark_not_overload(scope: Scope):
+    """Keep this request's 5xx from cutting the limit: it reports a bug, not a saturated server"""
+    scope.setdefault("state", {})["not_overload"] = True
+
+class GradientLimit:
+    """Concurrency limit driven by the ratio of baseline latency to recent latency.
+
+    While recent latency stays within `tolerance` x the long-term baseline the limit grows by about
+    sqrt(limit) per sample; once requests start queueing inside the server (latency rises above the
+    tolerance) the limit shrinks in proportion. Failed requests cut the limit multiplicatively.
+    """
+
+    def __init__(self, initial: int = CONCURRENCY_INITIAL_LIMIT, min_limit: int = CONCURRENCY_MIN_LIMIT,
+                 max_limit: int = CONCURRENCY_MAX_LIMIT, tolerance: float = CONCURRENCY_TOLERANCE,
+                 smoothing: float = CONCURRENCY_SMOOTHING):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.short_rtt: Optional[float] = None   # EWMA over the last ~10 samples
+        self.long_rtt: Optional[float] = None    # EWMA over the last ~600 samples
+
+    def on_sample(self, rtt: float, in_flight: int, failed: bool = False):
+        if failed:
+            self.limit = max(self.min_limit, self.limit * 0.9)
+            return
+
+        if self.short_rtt is None:
+            self.short_rtt = self.long_rtt = rtt
+            return
+        self.short_rtt += (rtt - self.short_rtt) * 0.1
+        self.long_rtt += (rtt - self.long_rtt) * (2 / 601)
+        # Latency recovered well below the baseline: let the baseline follow it down quickly
+        if self.long_rtt > 2 * self.short_rtt:
+            self.long_rtt *= 0.95
+
+        # Not using the current limit: latency says nothing about a higher one
+        if in_flight < self.limit / 2:
+            return
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / self.short_rtt))
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        self.limit = self.limit * (1 - self.smoothing) + new_limit * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, self.limit))
+
+class ConcurrencyLimiter:
+    """Admits up to `limit.limit` requests at once; the rest wait in per-priority queues.
+
+    Freed slots go to the highest-priority waiter. A request is shed (never started) when its class
+    queue is full or it waited longer than its class deadline.
+    """
+
+    def __init__(self, limit: GradientLimit, max_queue: int = CONCURRENCY_MAX_QUEUE,
+                 queue_timeout_ms: Optional[Dict[int, float]] = None):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout_ms = queue_timeout_ms or QUEUE_TIMEOUT_MS
+        self.in_flight = 0
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.queued: Dict[int, int] = {priority: 0 for priority in self.queue_timeout_ms}
+        self.shed: Dict[int, int] = {priority: 0 for priority in self.queue_timeout_ms}
+        self._sequence = itertools.count()
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit.limit)
+
+    async def acquire(self, priority: int) -> bool:
+        # Hand free slots to earlier waiters first (this also drops ones that gave up)
+        self._wake()
+        if self._has_capacity() and not self.waiters:
+            self.in_flight += 1
+            return True
+        if self.queued[priority] >= self.max_queue:
+            self.shed[priority] += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self._sequence), future))
+        self.queued[priority] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout_ms[priority] / 1000)
+            return True
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the deadline passed: use it
+                return True
+            future.cancel()
+            self.shed[priority] += 1
+            return False
+        except asyncio.CancelledError:
+            # The request went away while queued (e.g. client disconnect)
+            if future.done() and not future.cancelled():
+                self.in_flight -= 1  # a slot was already handed over: give it back
+                self._wake()
+            else:
+                future.cancel()  # so _wake skips it
+            raise
+        finally:
+            self.queued[priority] -= 1
+
+    def release(self, rtt: float, failed: bool):
+        self.limit.on_sample(rtt, self.in_flight, failed)
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self.waiters and self._has_capacity():
+            _, _, future = heapq.heappop(self.waiters)
+            if future.done():
+                continue  # gave up waiting
+            self.in_flight += 1
+            future.set_result(None)
+
+class ConcurrencyLimitMiddleware:
+    """Adaptive concurrency limiting with priority classes and fast 503 load shedding.
+
+    Without it every request is accepted and then waits for a pooled DB connection (up to
+    pool_timeout), so an overload turns into seconds of latency for all clients. Here excess
+    requests wait briefly in a priority queue and are otherwise rejected at once with
+    503 + Retry-After, while health checks bypass the limiter entirely.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: Optional[ConcurrencyLimiter] = None,
+                 retry_after: int = CONCURRENCY_RETRY_AFTER):
+        self.app = app
+        self.limiter = limiter or ConcurrencyLimiter(GradientLimit())
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        priority = classify(scope["method"], scope["path"])
+        if priority == CRITICAL:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.limiter.acquire(priority):
+            await self._reject(send, priority)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            failed = status_code >= 500 and not scope.get("state", {}).get("not_overload", False)
+            self.limiter.release(time.perf_counter() - started, failed=failed)
+
+    async def _reject(self, send: Send, priority: int) -> None:
+        body = json.dumps({"detail": "Server overloaded, retry later",
+                           "priority": PRIORITY_NAMES[priority]}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
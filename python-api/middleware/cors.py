@@ -0,0 +1,32 @@
+from starlette.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+class FastPathCORSMiddleware:
+    """CORSMiddleware that also skips same-origin requests.
+
+    Starlette's CORSMiddleware already passes requests without an Origin header straight to the
+    app. This wrapper adds the same-origin case: a browser request whose Origin equals its own
+    scheme://host is not subject to CORS, so it skips the origin matching and header rewriting.
+    """
+
+    def __init__(self, app: ASGIApp, **cors_options):
+        self.app = app
+        self.cors = CORSMiddleware(app, **cors_options)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = host = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"host":
+                host = value
+
+        if origin is None or (host is not None and origin == scope["scheme"].encode() + b"://" + host):
+            await self.app(scope, receive, send)
+            return
+
+        await self.cors(scope, receive, send)
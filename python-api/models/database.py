@@ -2,6 +2,8 @@ import os
 from sqlalchemy import create_engine, MetaData
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from fastapi import Request
+from models import query_budget
 
 # Database configuration
 DB_HOST = os.getenv("DB_HOST", "localhost")
@@ -10,6 +12,9 @@ DB_NAME = os.getenv("DB_NAME", "performance_test")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
 
+# เวลารอ connection จาก pool ก่อน timeout (วินาที)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "60"))
+
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 # SQLAlchemy setup with enhanced connection pool
@@ -17,7 +22,7 @@ engine = create_engine(
     DATABASE_URL,
     pool_size=20,        # จำนวน connections ที่เก็บไว้ใน pool
     max_overflow=30,     # จำนวน connections เพิ่มเติมที่สร้างได้เมื่อ pool เต็ม
-    pool_timeout=60,     # เวลารอ connection ก่อน timeout (วินาที)
+    pool_timeout=DB_POOL_TIMEOUT,  # เวลารอ connection ก่อน timeout (วินาที)
     pool_recycle=3600,   # เวลาที่ connection จะถูกสร้างใหม่ (1 ชั่วโมง)
     pool_pre_ping=True,  # ตรวจสอบ connection ก่อนใช้งาน
     echo=False           # ไม่ show SQL queries ใน logs
@@ -25,10 +30,16 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Count statements / DB time per request session (see models/query_budget.py)
+query_budget.install(engine)
+
 # Dependency to get database session
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    stats = query_budget.track_session(db, f"{request.method} {request.url.path}")
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+        if stats:
+            stats.report() 
\ No newline at end of file
@@ -0,0 +1,119 @@
+import logging
+import os
+import re
+import time
+from collections import Counter
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Query budget configuration
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "log").lower()                # off | log | reject
+QUERY_BUDGET_MAX_STATEMENTS = int(os.getenv("QUERY_BUDGET_MAX_STATEMENTS", "20"))  # statements ต่อ request
+QUERY_BUDGET_MAX_DB_MS = float(os.getenv("QUERY_BUDGET_MAX_DB_MS", "1000"))        # เวลา DB รวมต่อ request
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))                # statement shape ซ้ำกี่ครั้งถึงถือว่าเป็น N+1
+
+_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),                       # string literals
+    (re.compile(r"%\(\w+\)s|:\w+|\$\d+|%s"), "?"),              # bind parameters
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),                    # numeric literals
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),         # IN lists of any length
+    (re.compile(r"\s+"), " "),
+]
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+def statement_shape(statement: str) -> str:
+    """Statement text with literals and parameters removed, so repeats of one query compare equal"""
+    for pattern, replacement in _LITERALS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+class QueryStats:
+    """Statements and DB time of one request's session"""
+
+    def __init__(self, label: str, mode: str = QUERY_BUDGET_MODE, max_statements: int = QUERY_BUDGET_MAX_STATEMENTS,
+                 max_db_ms: float = QUERY_BUDGET_MAX_DB_MS, n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.label = label
+        self.mode = mode
+        self.max_statements = max_statements
+        self.max_db_ms = max_db_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.statements = 0
+        self.db_ms = 0.0
+        self.shapes: Counter = Counter()
+
+    def before_statement(self, statement: str):
+        self.statements += 1
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        if self.mode != "reject":
+            return
+        if self.max_statements and self.statements > self.max_statements:
+            raise QueryBudgetExceeded(
+                f"{self.label}: more than {self.max_statements} statements in one request")
+        if self.n_plus_one_threshold and self.shapes[shape] >= self.n_plus_one_threshold:
+            raise QueryBudgetExceeded(
+                f"{self.label}: N+1 query pattern, statement repeated {self.shapes[shape]} times: {shape[:200]}")
+
+    def after_statement(self, elapsed_ms: float):
+        self.db_ms += elapsed_ms
+        if self.mode == "reject" and self.max_db_ms and self.db_ms > self.max_db_ms:
+            raise QueryBudgetExceeded(
+                f"{self.label}: DB time {self.db_ms:.1f}ms exceeds budget of {self.max_db_ms:.0f}ms")
+
+    def report(self):
+        if self.mode == "off":
+            return
+        if self.max_statements and self.statements > self.max_statements:
+            logger.warning("%s: %d statements exceed budget of %d (%.1fms DB time)",
+                           self.label, self.statements, self.max_statements, self.db_ms)
+        if self.max_db_ms and self.db_ms > self.max_db_ms:
+            logger.warning("%s: DB time %.1fms exceeds budget of %.0fms (%d statements)",
+                           self.label, self.db_ms, self.max_db_ms, self.statements)
+        if self.n_plus_one_threshold:
+            for shape, count in self.shapes.items():
+                if count >= self.n_plus_one_threshold:
+                    logger.warning("%s: possible N+1, statement executed %d times: %s",
+                                   self.label, count, shape[:200])
+
+def track_session(session: Session, label: str) -> Optional[QueryStats]:
+    """Attach a QueryStats to `session`; every connection it checks out reports into it"""
+    if QUERY_BUDGET_MODE == "off":
+        return None
+    stats = QueryStats(label)
+    session.info["query_stats"] = stats
+    return stats
+
+@event.listens_for(Session, "after_begin")
+def _bind_stats_to_connection(session, transaction, connection):
+    stats = session.info.get("query_stats")
+    if stats is not None:
+        connection.info["query_stats"] = stats
+
+def install(engine: Engine):
+    """Register the statement counters on `engine` (once, at import of models.database)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = conn.info.get("query_stats")
+        if stats is not None:
+            stats.before_statement(statement)
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = conn.info.get("query_stats")
+        started = conn.info.get("query_started")
+        if stats is not None and started:
+            stats.after_statement((time.perf_counter() - started.pop()) * 1000)
+
+    @event.listens_for(engine, "checkin")
+    def _release_stats(dbapi_connection, connection_record):
+        # The pooled connection outlives the request: stop reporting into its stats
+        connection_record.info.pop("query_stats", None)
+        connection_record.info.pop("query_started", None)
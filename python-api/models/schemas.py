@@ -64,6 +64,30 @@ class Order(OrderBase):
     class Config:
         from_attributes = True
 
+# Nested user -> orders -> items schemas
+class OrderItemDetail(BaseModel):
+    id: int
+    product_id: int
+    quantity: int
+    price: Decimal
+
+    class Config:
+        from_attributes = True
+
+class OrderWithItems(BaseModel):
+    id: int
+    user_id: int
+    total_amount: Decimal
+    status: str
+    order_date: datetime
+    order_items: List[OrderItemDetail] = []
+
+    class Config:
+        from_attributes = True
+
+class UserWithOrders(User):
+    orders: List[OrderWithItems] = []
+
 # Complex query response schemas
 class OrderWithUser(BaseModel):
     order_id: int
@@ -94,6 +118,12 @@ class AnalyticsData(BaseModel):
     unique_customers: int
     avg_customer_age: float
 
+class AnalyticsFilter(BaseModel):
+    from_date: Optional[datetime] = None  # inclusive lower bound on orders.order_date
+    to_date: Optional[datetime] = None    # exclusive upper bound on orders.order_date
+    category: Optional[str] = None
+    status: Optional[str] = None
+
 class HealthCheck(BaseModel):
     status: str
     timestamp: datetime
@@ -1,20 +1,46 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
-from models.database import get_db
-from models.schemas import OrderWithUser, UserOrderSummary, AnalyticsData, HealthCheck
+from models.schemas import OrderWithUser, UserOrderSummary, AnalyticsData, AnalyticsFilter, HealthCheck
 from services.analytics_service import AnalyticsService
+from services.refresh_worker import refresh_worker
+from routers import http_cache
 
 router = APIRouter()
 
-@router.get("/orders-with-users")
-async def get_orders_with_users(limit: int = 10, offset: int = 0, db: Session = Depends(get_db)):
+# Tables every analytics endpoint reads from; any change to them changes the ETag
+ANALYTICS_TABLES = ["orders", "order_items", "products", "users"]
+
+# Page size cap; every (limit, offset, filters) combination is a separate refresh-worker cache entry
+MAX_PAGE_LIMIT = 1000
+
+def get_analytics_filter(
+    from_date: Optional[datetime] = Query(None, alias="from", description="Inclusive lower bound on order_date"),
+    to_date: Optional[datetime] = Query(None, alias="to", description="Exclusive upper bound on order_date"),
+    category: Optional[str] = Query(None, description="Product category"),
+    status_filter: Optional[str] = Query(None, alias="status", description="Order status"),
+) -> AnalyticsFilter:
+    if from_date is not None and to_date is not None and from_date >= to_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must be earlier than 'to'"
+        )
+    return AnalyticsFilter(from_date=from_date, to_date=to_date, category=category, status=status_filter)
+
+def render_json(content) -> bytes:
+    return JSONResponse(jsonable_encoder(content)).body
+
+# Response builders; they run on the refresh worker's thread pool with their own session
+def build_orders_with_users(db: Session, params: dict) -> bytes:
     analytics_service = AnalyticsService(db)
-    results = analytics_service.get_orders_with_users(limit=limit, offset=offset)
-    
+    results = analytics_service.get_orders_with_users(limit=params["limit"], offset=params["offset"],
+                                                      filters=AnalyticsFilter(**dict(params["filters"])))
+
     # Convert results to dict format
-    return [
+    return render_json([
         {
             "order_id": row.order_id,
             "user_id": row.user_id,
@@ -27,15 +53,15 @@ async def get_orders_with_users(limit: int = 10, offset: int = 0, db: Session =
             "item_count": row.item_count
         }
         for row in results
-    ]
+    ])
 
-@router.get("/user-order-summary")
-async def get_user_order_summary(limit: int = 10, offset: int = 0, db: Session = Depends(get_db)):
+def build_user_order_summary(db: Session, params: dict) -> bytes:
     analytics_service = AnalyticsService(db)
-    results = analytics_service.get_user_order_summary(limit=limit, offset=offset)
-    
+    results = analytics_service.get_user_order_summary(limit=params["limit"], offset=params["offset"],
+                                                       filters=AnalyticsFilter(**dict(params["filters"])))
+
     # Convert results to dict format
-    return [
+    return render_json([
         {
             "user_id": row.user_id,
             "user_name": row.user_name,
@@ -46,13 +72,12 @@ async def get_user_order_summary(limit: int = 10, offset: int = 0, db: Session =
             "last_order": row.last_order
         }
         for row in results
-    ]
+    ])
 
-@router.get("/analytics")
-async def get_complex_analytics(db: Session = Depends(get_db)):
+def build_complex_analytics(db: Session, params: dict) -> bytes:
     analytics_service = AnalyticsService(db)
-    result = analytics_service.get_complex_analytics()
-    
+    result = analytics_service.get_complex_analytics(filters=AnalyticsFilter(**dict(params["filters"])))
+
     # Since the service now returns a dict with 'data' and 'timestamp',
     # we need to process the data part and add the timestamp
     analytics_data = []
@@ -66,11 +91,47 @@ async def get_complex_analytics(db: Session = Depends(get_db)):
             "unique_customers": row.unique_customers,
             "avg_customer_age": row.avg_customer_age
         })
-    
-    return {
+
+    return render_json({
         "data": analytics_data,
         "timestamp": result["timestamp"]
-    }
+    })
+
+def filter_params(filters: AnalyticsFilter) -> tuple:
+    # Hashable form of the filters for the refresh worker's cache key
+    return tuple(sorted(filters.model_dump().items()))
+
+DEFAULT_PAGE = {"limit": 10, "offset": 0, "filters": filter_params(AnalyticsFilter())}
+refresh_worker.register("orders-with-users", build_orders_with_users, ANALYTICS_TABLES, warm=[DEFAULT_PAGE])
+refresh_worker.register("user-order-summary", build_user_order_summary, ANALYTICS_TABLES, warm=[DEFAULT_PAGE])
+refresh_worker.register("analytics", build_complex_analytics, ANALYTICS_TABLES,
+                        warm=[{"filters": DEFAULT_PAGE["filters"]}])
+
+async def cached_response(request: Request, response: Response, name: str, params: dict) -> Response:
+    entry = await refresh_worker.get(name, params)
+    not_modified = http_cache.check_entry(request, response, "analytics", entry.versions, entry.computed_at)
+    if not_modified:
+        return not_modified
+    return Response(content=entry.value, media_type="application/json", headers=dict(response.headers))
+
+@router.get("/orders-with-users")
+async def get_orders_with_users(request: Request, response: Response,
+                                limit: int = Query(10, ge=1, le=MAX_PAGE_LIMIT), offset: int = Query(0, ge=0),
+                                filters: AnalyticsFilter = Depends(get_analytics_filter)):
+    params = {"limit": limit, "offset": offset, "filters": filter_params(filters)}
+    return await cached_response(request, response, "orders-with-users", params)
+
+@router.get("/user-order-summary")
+async def get_user_order_summary(request: Request, response: Response,
+                                 limit: int = Query(10, ge=1, le=MAX_PAGE_LIMIT), offset: int = Query(0, ge=0),
+                                 filters: AnalyticsFilter = Depends(get_analytics_filter)):
+    params = {"limit": limit, "offset": offset, "filters": filter_params(filters)}
+    return await cached_response(request, response, "user-order-summary", params)
+
+@router.get("/analytics")
+async def get_complex_analytics(request: Request, response: Response,
+                                filters: AnalyticsFilter = Depends(get_analytics_filter)):
+    return await cached_response(request, response, "analytics", {"filters": filter_params(filters)})
 
 @router.get("/health")
 async def health_check():
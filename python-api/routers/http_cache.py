@@ -0,0 +1,80 @@
+import hashlib
+import os
+from datetime import datetime
+from fastapi import Request, Response, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from services.version_service import VersionService
+
+# Freshness (Cache-Control max-age, seconds) per endpoint; 0 means clients must revalidate every time
+CACHE_MAX_AGE = {
+    "users": int(os.getenv("CACHE_MAX_AGE_USERS", "0")),
+    "user": int(os.getenv("CACHE_MAX_AGE_USER", "0")),
+    "analytics": int(os.getenv("CACHE_MAX_AGE_ANALYTICS", "5")),
+}
+
+def make_etag(request: Request, *parts) -> str:
+    """Weak ETag over the request URL (path + query) and the data version parts"""
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(str(request.url.path).encode())
+    digest.update(b"?" + str(request.url.query).encode())
+    for part in parts:
+        digest.update(b"|" + str(part).encode())
+    return f'W/"{digest.hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def cache_headers(endpoint: str, etag: str) -> dict:
+    max_age = CACHE_MAX_AGE.get(endpoint, 0)
+    cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+def conditional_response(request: Request, response: Response, endpoint: str, etag: Optional[str]) -> Optional[Response]:
+    """Returns a 304 response when the client's copy is current; otherwise sets the caching headers
+    on `response` and returns None so the endpoint builds the full body."""
+    if etag is None:
+        return None
+    headers = cache_headers(endpoint, etag)
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def check_tables(request: Request, response: Response, db: Session, endpoint: str,
+                 tables: List[str]) -> Optional[Response]:
+    """Conditional GET for responses derived from whole tables (uses the per-table change counters)"""
+    versions = VersionService(db).get_table_versions(tables)
+    if versions is None:
+        return None
+    etag = make_etag(request, *(f"{table}:{versions[table]}" for table in tables))
+    return conditional_response(request, response, endpoint, etag)
+
+def check_user(request: Request, response: Response, updated_at: Optional[datetime]) -> Optional[Response]:
+    """Conditional GET for a single, already loaded user row (ETag from users.updated_at)"""
+    if updated_at is None:
+        return None
+    return conditional_response(request, response, "user", make_etag(request, updated_at.isoformat()))
+
+def check_entry(request: Request, response: Response, endpoint: str, versions: Optional[dict],
+                computed_at: float) -> Optional[Response]:
+    """Conditional GET for a response served from the refresh worker; the ETag follows the table
+    versions the entry was computed at (or its compute time when the database has no counters)"""
+    if versions is not None:
+        etag = make_etag(request, *(f"{table}:{versions[table]}" for table in sorted(versions)))
+    else:
+        etag = make_etag(request, f"computed:{computed_at}")
+    return conditional_response(request, response, endpoint, etag)
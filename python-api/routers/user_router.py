@@ -1,20 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import BaseModel, TypeAdapter
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Type
 from models.database import get_db
-from models.schemas import User, UserCreate, UserUpdate
-from services.user_service import UserService
+from models.schemas import User, UserCreate, UserUpdate, UserWithOrders, OrderWithItems
+from services.user_service import UserService, create_user_op, update_user_op, delete_user_op
+from services.group_commit import GROUP_COMMIT_ENABLED, group_commit_writer
+from routers import http_cache
 
 router = APIRouter()
 
+# Per-user cap on nested orders
+DEFAULT_ORDER_LIMIT = 50
+MAX_ORDER_LIMIT = 500
+# Users per page with include=orders (up to MAX_INCLUDE_LIMIT * order_limit orders per request)
+MAX_INCLUDE_LIMIT = 50
+
+def json_list_response(items: List, schema: Type[BaseModel], response: Response) -> Response:
+    """Serialize the whole list in one pydantic pass, for bodies that don't match the route's response_model"""
+    adapter = TypeAdapter(List[schema])
+    body = adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+    # Carry over the caching headers set on the injected response
+    headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/users", response_model=List[User])
-async def get_users(limit: int = 10, offset: int = 0, db: Session = Depends(get_db)):
+async def get_users(request: Request, response: Response, limit: int = 10, offset: int = 0,
+                    include: Optional[str] = Query(None, description="'orders' to embed each user's latest orders"),
+                    order_limit: int = Query(DEFAULT_ORDER_LIMIT, ge=1, le=MAX_ORDER_LIMIT),
+                    db: Session = Depends(get_db)):
+    if include not in (None, "orders"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported include: {include}"
+        )
+    if include == "orders" and limit > MAX_INCLUDE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"limit must be <= {MAX_INCLUDE_LIMIT} with include=orders"
+        )
+    tables = ["users", "orders", "order_items"] if include == "orders" else ["users"]
+    not_modified = http_cache.check_tables(request, response, db, "users", tables)
+    if not_modified:
+        return not_modified
     user_service = UserService(db)
+    if include == "orders":
+        users = user_service.get_users_with_recent_orders(limit=limit, offset=offset, order_limit=order_limit)
+        return json_list_response(users, UserWithOrders, response)
     users = user_service.get_users(limit=limit, offset=offset)
     return users
 
 @router.get("/users/{user_id}", response_model=User)
-async def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(request: Request, response: Response, user_id: int, db: Session = Depends(get_db)):
     user_service = UserService(db)
     user = user_service.get_user(user_id)
     if not user:
@@ -22,17 +59,41 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User with id {user_id} not found"
         )
+    # One query either way; a matching ETag only saves the serialization
+    not_modified = http_cache.check_user(request, response, user.updated_at)
+    if not_modified:
+        return not_modified
     return user
 
+@router.get("/users/{user_id}/orders", response_model=List[OrderWithItems])
+async def get_user_orders(request: Request, response: Response, user_id: int,
+                          order_limit: int = Query(DEFAULT_ORDER_LIMIT, ge=1, le=MAX_ORDER_LIMIT),
+                          db: Session = Depends(get_db)):
+    not_modified = http_cache.check_tables(request, response, db, "users", ["users", "orders", "order_items"])
+    if not_modified:
+        return not_modified
+    user_service = UserService(db)
+    if not user_service.get_user(user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id {user_id} not found"
+        )
+    return user_service.get_user_orders(user_id, order_limit=order_limit)
+
 @router.post("/users", response_model=User, status_code=status.HTTP_201_CREATED)
 async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
+    if GROUP_COMMIT_ENABLED:
+        return await group_commit_writer.submit(create_user_op(user_data))
     user_service = UserService(db)
     return user_service.create_user(user_data)
 
 @router.put("/users/{user_id}", response_model=User)
 async def update_user(user_id: int, user_data: UserUpdate, db: Session = Depends(get_db)):
-    user_service = UserService(db)
-    updated_user = user_service.update_user(user_id, user_data)
+    if GROUP_COMMIT_ENABLED:
+        updated_user = await group_commit_writer.submit(update_user_op(user_id, user_data))
+    else:
+        user_service = UserService(db)
+        updated_user = user_service.update_user(user_id, user_data)
     if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -42,8 +103,11 @@ async def update_user(user_id: int, user_data: UserUpdate, db: Session = Depends
 
 @router.delete("/users/{user_id}")
 async def delete_user(user_id: int, db: Session = Depends(get_db)):
-    user_service = UserService(db)
-    success = user_service.delete_user(user_id)
+    if GROUP_COMMIT_ENABLED:
+        success = await group_commit_writer.submit(delete_user_op(user_id))
+    else:
+        user_service = UserService(db)
+        success = user_service.delete_user(user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
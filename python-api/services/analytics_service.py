@@ -1,48 +1,101 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from typing import List
+from typing import List, Optional, Tuple, Dict, Any
 from datetime import datetime
+from models.schemas import AnalyticsFilter
 
 class AnalyticsService:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_orders_with_users(self, limit: int = 10, offset: int = 0):
-        query = text("""
-            SELECT o.id as order_id, o.user_id, u.name as user_name, u.email as user_email, 
+    @staticmethod
+    def _order_conditions(filters: Optional[AnalyticsFilter], alias: str = "o",
+                          default_status: Optional[str] = None) -> Tuple[List[str], Dict[str, Any]]:
+        """Build order-level predicates (order_date range, status, category) for `alias`.
+
+        The category filter is expressed as an EXISTS over order_items/products so it can be
+        used by queries that do not already join products.
+        """
+        filters = filters or AnalyticsFilter()
+        conditions: List[str] = []
+        params: Dict[str, Any] = {}
+
+        if filters.from_date is not None:
+            conditions.append(f"{alias}.order_date >= :from_date")
+            params["from_date"] = filters.from_date
+        if filters.to_date is not None:
+            conditions.append(f"{alias}.order_date < :to_date")
+            params["to_date"] = filters.to_date
+
+        status = filters.status or default_status
+        if status is not None:
+            conditions.append(f"{alias}.status = :status")
+            params["status"] = status
+
+        if filters.category is not None:
+            conditions.append(f"""EXISTS (
+                SELECT 1 FROM order_items fi
+                JOIN products fp ON fp.id = fi.product_id
+                WHERE fi.order_id = {alias}.id AND fp.category = :category
+            )""")
+            params["category"] = filters.category
+
+        return conditions, params
+
+    def get_orders_with_users(self, limit: int = 10, offset: int = 0,
+                              filters: Optional[AnalyticsFilter] = None):
+        conditions, params = self._order_conditions(filters)
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        query = text(f"""
+            SELECT o.id as order_id, o.user_id, u.name as user_name, u.email as user_email,
                    u.city as user_city, o.total_amount, o.status, o.order_date,
                    COUNT(oi.id) as item_count
             FROM orders o
             JOIN users u ON o.user_id = u.id
             LEFT JOIN order_items oi ON o.id = oi.order_id
+            {where_clause}
             GROUP BY o.id, o.user_id, u.name, u.email, u.city, o.total_amount, o.status, o.order_date
             ORDER BY o.id
             LIMIT :limit OFFSET :offset
         """)
-        
-        result = self.db.execute(query, {"limit": limit, "offset": offset})
+
+        result = self.db.execute(query, {"limit": limit, "offset": offset, **params})
         return result.fetchall()
 
-    def get_user_order_summary(self, limit: int = 10, offset: int = 0):
-        query = text("""
-            SELECT u.id as user_id, u.name as user_name, u.email as user_email, 
+    def get_user_order_summary(self, limit: int = 10, offset: int = 0,
+                               filters: Optional[AnalyticsFilter] = None):
+        # Filters go into the JOIN condition so users without matching orders are still listed
+        conditions, params = self._order_conditions(filters)
+        join_clause = " AND ".join(["u.id = o.user_id"] + conditions)
+
+        query = text(f"""
+            SELECT u.id as user_id, u.name as user_name, u.email as user_email,
                    COUNT(o.id) as total_orders,
                    COALESCE(SUM(o.total_amount), 0) as total_amount,
                    COALESCE(AVG(o.total_amount), 0) as average_order,
                    COALESCE(MAX(o.order_date), '1970-01-01'::timestamp) as last_order
             FROM users u
-            LEFT JOIN orders o ON u.id = o.user_id
+            LEFT JOIN orders o ON {join_clause}
             GROUP BY u.id, u.name, u.email
             ORDER BY total_amount DESC
             LIMIT :limit OFFSET :offset
         """)
-        
-        result = self.db.execute(query, {"limit": limit, "offset": offset})
+
+        result = self.db.execute(query, {"limit": limit, "offset": offset, **params})
         return result.fetchall()
 
-    def get_complex_analytics(self):
-        query = text("""
-            SELECT 
+    def get_complex_analytics(self, filters: Optional[AnalyticsFilter] = None):
+        filters = filters or AnalyticsFilter()
+        # Category is filtered on the joined products row directly instead of via EXISTS
+        order_filters = filters.model_copy(update={"category": None})
+        conditions, params = self._order_conditions(order_filters, default_status="completed")
+        if filters.category is not None:
+            conditions.append("p.category = :category")
+            params["category"] = filters.category
+
+        query = text(f"""
+            SELECT
                 p.category,
                 COUNT(DISTINCT o.id) as total_orders,
                 SUM(oi.quantity) as total_quantity,
@@ -54,15 +107,15 @@ class AnalyticsService:
             JOIN order_items oi ON p.id = oi.product_id
             JOIN orders o ON oi.order_id = o.id
             JOIN users u ON o.user_id = u.id
-            WHERE o.status = 'completed'
+            WHERE {' AND '.join(conditions)}
             GROUP BY p.category
             ORDER BY total_revenue DESC
         """)
-        
-        result = self.db.execute(query)
+
+        result = self.db.execute(query, params)
         analytics = result.fetchall()
-        
+
         return {
             "data": analytics,
             "timestamp": datetime.utcnow().isoformat() + "Z"
-        } 
\ No newline at end of file
+        }
@@ -0,0 +1,176 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+from typing import Callable, Dict, List, Optional, Sequence, Set
+import psycopg2
+import psycopg2.extensions
+from models.database import DATABASE_URL
+from services.version_service import VERSIONED_TABLES
+
+logger = logging.getLogger(__name__)
+
+# Change feed configuration (opt-in NOTIFY triggers in database/change_feed.sql)
+CHANGE_FEED_ENABLED = os.getenv("CHANGE_FEED_ENABLED", "false").lower() in ("1", "true", "yes")
+CHANGE_FEED_CHANNEL = os.getenv("CHANGE_FEED_CHANNEL", "table_changes")
+CHANGE_FEED_BATCH_MS = float(os.getenv("CHANGE_FEED_BATCH_MS", "50"))            # รวม notifications ในช่วงนี้เป็น batch เดียว
+CHANGE_FEED_MAX_KEYS = int(os.getenv("CHANGE_FEED_MAX_KEYS", "1000"))           # keys ต่อ table ต่อ batch ก่อนเปลี่ยนเป็น whole-table
+CHANGE_FEED_MAX_BACKOFF = float(os.getenv("CHANGE_FEED_MAX_BACKOFF", "30"))     # วินาที: รอสูงสุดก่อน reconnect
+
+# table -> changed keys, or None when the whole table must be treated as changed
+Changes = Dict[str, Optional[Set[int]]]
+Subscriber = Callable[[Changes], object]
+
+def merge_change(changes: Changes, table: str, ids: Optional[List[int]], max_keys: int = CHANGE_FEED_MAX_KEYS):
+    """Fold one notification into a pending batch, deduplicating keys"""
+    if table in changes and changes[table] is None:
+        return
+    if ids is None:
+        changes[table] = None
+        return
+    keys = changes.setdefault(table, set())
+    keys.update(ids)
+    if len(keys) > max_keys:
+        changes[table] = None
+
+class ChangeFeed:
+    """LISTENs on the change channel and publishes batched table/key invalidations in-process.
+
+    Notifications from every service writing to the database (each one a statement on users,
+    products, orders or order_items) are collected for CHANGE_FEED_BATCH_MS, deduplicated and
+    handed to subscribers as one `Changes` dict. When the connection drops the feed reconnects with
+    exponential backoff and then publishes every table as changed, since notifications sent while
+    disconnected are lost.
+    """
+
+    def __init__(self, dsn: str = DATABASE_URL, channel: str = CHANGE_FEED_CHANNEL,
+                 batch_ms: float = CHANGE_FEED_BATCH_MS, tables: Sequence[str] = VERSIONED_TABLES):
+        self.dsn = dsn
+        self.channel = channel
+        self.batch_ms = batch_ms
+        self.tables = tables
+        self.subscribers: List[Subscriber] = []
+        self.pending: Changes = {}
+        self.connected = False
+        self._connection = None
+        self._fd: Optional[int] = None
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._lost: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, callback: Subscriber):
+        """`callback(changes)` may be a plain function or a coroutine function"""
+        self.subscribers.append(callback)
+
+    async def start(self):
+        self._lost = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._disconnect()
+
+    def _connect(self):
+        connection = psycopg2.connect(self.dsn, keepalives=1, keepalives_idle=30,
+                                      keepalives_interval=10, keepalives_count=3)
+        connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def _disconnect(self):
+        # After a failed poll() psycopg2 marks the connection closed and fileno() raises,
+        # so the reader is removed by the fd saved at connect time
+        if self._fd is not None:
+            asyncio.get_running_loop().remove_reader(self._fd)
+            self._fd = None
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except psycopg2.Error:
+                pass
+            self._connection = None
+        self.connected = False
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        backoff = 0.5
+        reconnect = False
+        while True:
+            try:
+                self._connection = await loop.run_in_executor(None, self._connect)
+            except psycopg2.Error as e:
+                logger.warning("Change feed connect failed, retrying in %.1fs: %s", backoff, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, CHANGE_FEED_MAX_BACKOFF)
+                reconnect = True
+                continue
+
+            backoff = 0.5
+            self.connected = True
+            self._lost.clear()
+            self._fd = self._connection.fileno()
+            loop.add_reader(self._fd, self._on_readable)
+            # NOTIFYs that arrived together with the LISTEN reply are already queued
+            self._drain_notifies()
+            if reconnect:
+                # Anything may have changed while we were not listening
+                for table in self.tables:
+                    merge_change(self.pending, table, None)
+                self._schedule_flush()
+
+            await self._lost.wait()
+            self._disconnect()
+            reconnect = True
+
+    def _on_readable(self):
+        try:
+            self._connection.poll()
+        except psycopg2.Error as e:
+            logger.warning("Change feed connection lost: %s", e)
+            self._lost.set()
+        self._drain_notifies()
+
+    def _drain_notifies(self):
+        while self._connection.notifies:
+            notify = self._connection.notifies.pop(0)
+            try:
+                payload = json.loads(notify.payload)
+                merge_change(self.pending, payload["t"], payload.get("ids"))
+            except (ValueError, KeyError):
+                logger.warning("Ignoring malformed change notification: %r", notify.payload)
+        if self.pending:
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.batch_ms / 1000, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        changes, self.pending = self.pending, {}
+        for callback in self.subscribers:
+            try:
+                result = callback(changes)
+                if inspect.isawaitable(result):
+                    asyncio.ensure_future(result).add_done_callback(self._log_failure)
+            except Exception:
+                logger.exception("Change feed subscriber failed")
+
+    @staticmethod
+    def _log_failure(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Change feed subscriber failed", exc_info=future.exception())
+
+change_feed = ChangeFeed()
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+from typing import Any, Callable, List, Optional, Tuple
+from sqlalchemy.engine import Connection, Engine
+from models.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Group commit configuration
+GROUP_COMMIT_ENABLED = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() in ("1", "true", "yes")
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "2"))   # เวลารวบรวม writes ต่อ batch
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "100"))   # จำนวน writes สูงสุดต่อ transaction
+
+Operation = Callable[[Connection], Any]
+
+class GroupCommitWriter:
+    """Collects concurrent write operations for a short window and applies them in one transaction.
+
+    Each operation is a callable that receives the shared Connection and returns its result.
+    Callers get their own result or exception back; a failing operation only fails its caller.
+    """
+
+    def __init__(self, engine: Engine, window_ms: float = 2, max_batch: int = 100):
+        self.engine = engine
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, operation: Operation) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Operation, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            operations = [operation for operation, _ in batch]
+            try:
+                outcomes = await loop.run_in_executor(None, self._apply, operations)
+            except Exception as exc:
+                # The shared commit itself failed: every caller in the batch gets the error
+                logger.exception("Group commit of %d operations failed", len(batch))
+                outcomes = [(False, exc)] * len(batch)
+
+            for (_, future), (ok, value) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _apply(self, operations: List[Operation]) -> List[Tuple[bool, Any]]:
+        # Optimistic pass without savepoints: the common case costs one transaction and one commit
+        failed: Optional[Exception] = None
+        try:
+            with self.engine.begin() as conn:
+                outcomes = []
+                for operation in operations:
+                    try:
+                        outcomes.append((True, operation(conn)))
+                    except Exception as exc:
+                        failed = exc
+                        raise
+                return outcomes
+        except Exception:
+            if failed is None:
+                raise  # the commit itself failed
+            if len(operations) == 1:
+                # An ordinary per-request error (e.g. duplicate email): report it to its caller only
+                return [(False, failed)]
+        # Some operation failed: replay the batch with a savepoint per operation so the
+        # failure is reported to its own caller and the rest still commit together
+        outcomes = []
+        with self.engine.begin() as conn:
+            for operation in operations:
+                savepoint = conn.begin_nested()
+                try:
+                    result = operation(conn)
+                    savepoint.commit()
+                    outcomes.append((True, result))
+                except Exception as exc:
+                    savepoint.rollback()
+                    outcomes.append((False, exc))
+        return outcomes
+
+group_commit_writer = GroupCommitWriter(engine, GROUP_COMMIT_WINDOW_MS, GROUP_COMMIT_MAX_BATCH)
@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from models.database import SessionLocal
+from services.version_service import VersionService
+
+logger = logging.getLogger(__name__)
+
+# Background refresh configuration
+REFRESH_ENABLED = os.getenv("REFRESH_ENABLED", "true").lower() in ("1", "true", "yes")
+REFRESH_WORKERS = int(os.getenv("REFRESH_WORKERS", "2"))                 # background refreshes ที่รันพร้อมกันได้สูงสุด
+REFRESH_FOREGROUND_WORKERS = int(os.getenv("REFRESH_FOREGROUND_WORKERS", "2"))  # cold computes ที่ request รออยู่
+REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", "30"))            # วินาที: refresh อย่างน้อยทุกช่วงนี้ถ้าไม่รู้ว่าข้อมูลเปลี่ยนหรือไม่
+REFRESH_MIN_AGE = float(os.getenv("REFRESH_MIN_AGE", "1"))               # วินาที: ไม่ refresh entry ที่อายุน้อยกว่านี้
+REFRESH_CHECK_INTERVAL = float(os.getenv("REFRESH_CHECK_INTERVAL", "2"))  # วินาที: รอบตรวจ table versions
+REFRESH_MAX_ENTRIES = int(os.getenv("REFRESH_MAX_ENTRIES", "256"))
+REFRESH_MAX_BYTES = int(os.getenv("REFRESH_MAX_BYTES", str(64 * 1024 * 1024)))  # ขนาดรวมของ cached bodies
+REFRESH_IDLE_TTL = float(os.getenv("REFRESH_IDLE_TTL", "300"))           # วินาที: ลบ entry ที่ไม่มีใครขอ
+REFRESH_ACTIVE_WINDOW = float(os.getenv("REFRESH_ACTIVE_WINDOW", "30"))  # วินาที: refresh เบื้องหลังเฉพาะ entry ที่ถูกขอภายในช่วงนี้
+
+ComputeFn = Callable[[Session, Dict[str, Any]], Any]
+CacheKey = Tuple[str, Tuple[Tuple[str, Any], ...]]
+
+class RefreshJob:
+    def __init__(self, name: str, compute: ComputeFn, tables: List[str], warm: List[Dict[str, Any]]):
+        self.name = name
+        self.compute = compute
+        self.tables = tables
+        self.warm = warm
+
+class CacheEntry:
+    def __init__(self, value: Any, versions: Optional[Dict[str, int]]):
+        self.value = value
+        self.versions = versions          # table versions read before the value was computed
+        self.size = len(value) if isinstance(value, (bytes, str)) else 0
+        self.computed_at = time.time()
+        self.accessed_at = self.computed_at
+        self.stale = False
+
+class RefreshWorker:
+    """Serves registered expensive queries from memory and recomputes them in the background.
+
+    Requests get the last good result (stale-while-revalidate). Entries are refreshed when the
+    tables they read change (checked every REFRESH_CHECK_INTERVAL), when invalidated, or every
+    REFRESH_INTERVAL when the database has no version counters. Only warm entries and entries
+    requested within REFRESH_ACTIVE_WINDOW are refreshed in the background; other stale entries are
+    recomputed when next requested. Background refreshes and the computes a request is waiting on run
+    on separate bounded thread pools, so a refresh backlog never delays a cold request. Warm entries
+    are never evicted; the others are evicted LRU beyond REFRESH_MAX_ENTRIES / REFRESH_MAX_BYTES.
+    """
+
+    def __init__(self, enabled: bool = REFRESH_ENABLED, max_workers: int = REFRESH_WORKERS,
+                 foreground_workers: int = REFRESH_FOREGROUND_WORKERS):
+        self.enabled = enabled
+        self.max_workers = max_workers
+        self.foreground_workers = foreground_workers
+        self.jobs: Dict[str, RefreshJob] = {}
+        self.warm_keys: Set[CacheKey] = set()
+        self.entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self.size = 0
+        self.in_flight: Dict[CacheKey, asyncio.Future] = {}
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.foreground_executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, compute: ComputeFn, tables: List[str],
+                 warm: Optional[List[Dict[str, Any]]] = None):
+        """`warm` lists the parameter sets computed at startup and kept resident"""
+        job = RefreshJob(name, compute, tables, warm if warm is not None else [{}])
+        self.jobs[name] = job
+        self.warm_keys.update(self._key(name, params) for params in job.warm)
+
+    @staticmethod
+    def _key(name: str, params: Dict[str, Any]) -> CacheKey:
+        return name, tuple(sorted(params.items()))
+
+    async def start(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="refresh")
+        self.foreground_executor = ThreadPoolExecutor(max_workers=self.foreground_workers,
+                                                      thread_name_prefix="refresh-fg")
+        if not self.enabled:
+            return
+        warm_ups = [self._refresh(key, foreground=True) for key in self.warm_keys]
+        for result in await asyncio.gather(*warm_ups, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.warning("Warm-up of a refresh job failed: %s", result)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for executor in (self.executor, self.foreground_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self.executor = self.foreground_executor = None
+
+    async def get(self, name: str, params: Dict[str, Any]) -> CacheEntry:
+        key = self._key(name, params)
+        if not self.enabled:
+            return await self._compute(key, self.foreground_executor)
+
+        entry = self.entries.get(key)
+        now = time.time()
+        if entry is None or (entry.stale and key not in self.warm_keys
+                             and now - entry.accessed_at > REFRESH_ACTIVE_WINDOW):
+            # Cold parameter set, or one stale since before it went idle: the first caller computes,
+            # concurrent callers share the result
+            entry = await self._refresh(key, foreground=True)
+            entry.accessed_at = time.time()
+            return entry
+
+        entry.accessed_at = now
+        self.entries.move_to_end(key)
+        if entry.stale:
+            self._refresh_in_background(key)
+        return entry
+
+    def invalidate(self, tables: Optional[List[str]] = None, name: Optional[str] = None):
+        """Mark entries stale; they are recomputed in the background and served meanwhile"""
+        for key, entry in list(self.entries.items()):
+            job = self.jobs[key[0]]
+            if name is not None and job.name != name:
+                continue
+            if tables is not None and not set(tables) & set(job.tables):
+                continue
+            entry.stale = True
+            self._refresh_in_background(key)
+
+    def _refresh_in_background(self, key: CacheKey):
+        entry = self.entries.get(key)
+        now = time.time()
+        if key in self.in_flight or (entry is not None and now - entry.computed_at < REFRESH_MIN_AGE):
+            return
+        if entry is not None and key not in self.warm_keys and now - entry.accessed_at > REFRESH_ACTIVE_WINDOW:
+            return  # nobody is reading it: recompute on the next request instead
+        task = asyncio.ensure_future(self._refresh(key))
+        # Failures are logged by _refresh; the last good value stays in place
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _refresh(self, key: CacheKey, foreground: bool = False) -> CacheEntry:
+        if key in self.in_flight:
+            return await asyncio.shield(self.in_flight[key])
+
+        executor = self.foreground_executor if foreground else self.executor
+        future = asyncio.ensure_future(self._compute(key, executor))
+        self.in_flight[key] = future
+        try:
+            entry = await asyncio.shield(future)
+        except Exception:
+            logger.exception("Refresh of %s failed", key[0])
+            raise
+        finally:
+            self.in_flight.pop(key, None)
+
+        previous = self.entries.get(key)
+        if previous is not None:
+            # A background refresh is not a read: keep the entry's access time
+            entry.accessed_at = previous.accessed_at
+            self.size -= previous.size
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        self.size += entry.size
+        self._evict()
+        return entry
+
+    def _remove(self, key: CacheKey):
+        self.size -= self.entries.pop(key).size
+
+    def _evict(self):
+        """Drop least recently used entries, never warm ones, until within the entry and byte caps"""
+        for key in list(self.entries):
+            if len(self.entries) <= REFRESH_MAX_ENTRIES and self.size <= REFRESH_MAX_BYTES:
+                return
+            if key not in self.warm_keys:
+                self._remove(key)
+
+    async def _compute(self, key: CacheKey, executor: Optional[ThreadPoolExecutor]) -> CacheEntry:
+        job = self.jobs[key[0]]
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self._compute_sync, job, dict(key[1]))
+
+    @staticmethod
+    def _compute_sync(job: RefreshJob, params: Dict[str, Any]) -> CacheEntry:
+        db = SessionLocal()
+        try:
+            # Versions are read first: if a write lands during the query the entry looks older than
+            # its data and gets refreshed again, never the other way round
+            versions = VersionService(db).get_table_versions(job.tables)
+            return CacheEntry(job.compute(db, params), versions)
+        finally:
+            db.close()
+
+    def _current_versions(self) -> Optional[Dict[str, int]]:
+        tables = sorted({table for job in self.jobs.values() for table in job.tables})
+        db = SessionLocal()
+        try:
+            return VersionService(db).get_table_versions(tables)
+        finally:
+            db.close()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(REFRESH_CHECK_INTERVAL)
+            try:
+                # Default executor: the poll must not queue behind refreshes on self.executor
+                versions = await loop.run_in_executor(None, self._current_versions)
+            except Exception:
+                logger.exception("Reading table versions failed")
+                versions = None
+
+            now = time.time()
+            for key, entry in list(self.entries.items()):
+                if key not in self.warm_keys and now - entry.accessed_at > REFRESH_IDLE_TTL:
+                    self._remove(key)
+                    continue
+                tables = self.jobs[key[0]].tables
+                if versions is not None and entry.versions is not None:
+                    changed = any(versions.get(table) != entry.versions.get(table) for table in tables)
+                else:
+                    changed = now - entry.computed_at >= REFRESH_INTERVAL
+                if changed or entry.stale:
+                    entry.stale = True
+                    self._refresh_in_background(key)
+
+refresh_worker = RefreshWorker()
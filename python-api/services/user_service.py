@@ -1,8 +1,14 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from models.models import User
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.engine import Connection
+from sqlalchemy import text, insert, update, delete, select, true, any_, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from models.models import User, Order, OrderItem
 from models.schemas import UserCreate, UserUpdate
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional
+
+users_table = User.__table__
+orders_table = Order.__table__
 
 class UserService:
     def __init__(self, db: Session):
@@ -14,6 +20,58 @@ class UserService:
     def get_user(self, user_id: int) -> Optional[User]:
         return self.db.query(User).filter(User.id == user_id).first()
 
+    def get_recent_orders(self, user_ids: List[int], order_limit: int) -> Dict[int, List[Order]]:
+        """Latest `order_limit` orders (with items) of each user; two queries however many users.
+
+        Each user's orders come from a LATERAL subquery with its own LIMIT, so PostgreSQL reads only
+        the first `order_limit` entries of idx_orders_user_id_order_date per user instead of
+        ranking the user's whole order history. Items are loaded with a single `= ANY(:order_ids)`
+        array parameter rather than selectinload, which splits into one IN query per 500 orders.
+        """
+        if not user_ids:
+            return {}
+        recent = (select(Order)
+                  .where(Order.user_id == users_table.c.id)
+                  .order_by(Order.order_date.desc(), Order.id.desc())
+                  .limit(order_limit)
+                  .lateral("recent_orders"))
+        recent_order = aliased(Order, recent)
+        orders = (self.db.query(recent_order)
+                  .select_from(users_table)
+                  .join(recent, true())
+                  .filter(users_table.c.id.in_(user_ids))
+                  .order_by(recent_order.user_id, recent_order.order_date.desc(), recent_order.id.desc())
+                  .all())
+        self._attach_items(orders)
+
+        grouped: Dict[int, List[Order]] = {user_id: [] for user_id in user_ids}
+        for order in orders:
+            grouped[order.user_id].append(order)
+        return grouped
+
+    def _attach_items(self, orders: List[Order]):
+        items: Dict[int, List[OrderItem]] = {order.id: [] for order in orders}
+        if items:
+            order_ids = bindparam("order_ids", list(items), type_=ARRAY(Integer))
+            for item in (self.db.query(OrderItem)
+                         .filter(OrderItem.order_id == any_(order_ids))
+                         .order_by(OrderItem.order_id, OrderItem.id)):
+                items[item.order_id].append(item)
+        for order in orders:
+            # Populate the relationship without a lazy load and without marking the order dirty
+            set_committed_value(order, "order_items", items[order.id])
+
+    def get_users_with_recent_orders(self, limit: int = 10, offset: int = 0, order_limit: int = 50) -> List[User]:
+        users = self.get_users(limit=limit, offset=offset)
+        orders = self.get_recent_orders([user.id for user in users], order_limit)
+        for user in users:
+            # Populate the relationship without a lazy load and without marking the user dirty
+            set_committed_value(user, "orders", orders[user.id])
+        return users
+
+    def get_user_orders(self, user_id: int, order_limit: int = 50) -> List[Order]:
+        return self.get_recent_orders([user_id], order_limit)[user_id]
+
     def create_user(self, user_data: UserCreate) -> User:
         db_user = User(**user_data.dict())
         self.db.add(db_user)
@@ -58,4 +116,35 @@ class UserService:
         """)
         
         result = self.db.execute(query, {"limit": limit, "offset": offset})
-        return result.fetchall() 
\ No newline at end of file
+        return result.fetchall()
+
+# Group-commit operations: executed by GroupCommitWriter inside a shared transaction.
+# They use RETURNING instead of a follow-up refresh SELECT.
+def create_user_op(user_data: UserCreate) -> Callable[[Connection], Dict[str, Any]]:
+    values = user_data.dict()
+
+    def operation(conn: Connection) -> Dict[str, Any]:
+        row = conn.execute(insert(users_table).values(**values).returning(*users_table.c)).first()
+        return dict(row._mapping)
+    return operation
+
+def update_user_op(user_id: int, user_data: UserUpdate) -> Callable[[Connection], Optional[Dict[str, Any]]]:
+    values = user_data.dict(exclude_unset=True)
+
+    def operation(conn: Connection) -> Optional[Dict[str, Any]]:
+        if values:
+            statement = (update(users_table).where(users_table.c.id == user_id)
+                         .values(**values).returning(*users_table.c))
+        else:
+            statement = select(users_table).where(users_table.c.id == user_id)
+        row = conn.execute(statement).first()
+        return dict(row._mapping) if row else None
+    return operation
+
+def delete_user_op(user_id: int) -> Callable[[Connection], bool]:
+    def operation(conn: Connection) -> bool:
+        # Same outcome as UserService.delete_user: the ORM detaches the user's orders (user_id = NULL)
+        # instead of letting ON DELETE CASCADE remove them with their items
+        conn.execute(update(orders_table).where(orders_table.c.user_id == user_id).values(user_id=None))
+        return conn.execute(delete(users_table).where(users_table.c.id == user_id)).rowcount > 0
+    return operation
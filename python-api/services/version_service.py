@@ -0,0 +1,52 @@
+import logging
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import DBAPIError
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL SQLSTATE for "relation does not exist"
+UNDEFINED_TABLE = "42P01"
+
+# Tables with a change counter in table_versions (see database/init.sql)
+VERSIONED_TABLES = ("users", "products", "orders", "order_items")
+
+class VersionService:
+    # Set to False once the database turns out not to have the table_versions counters
+    versions_available = True
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_table_versions(self, tables: List[str]) -> Optional[Dict[str, int]]:
+        """Current change counter of each table, or None if the schema has no counters or the read failed"""
+        if not VersionService.versions_available:
+            return None
+
+        unknown = set(tables) - set(VERSIONED_TABLES)
+        if unknown:
+            raise ValueError(f"No version counter for tables: {sorted(unknown)}")
+
+        # Counters are bumped inside the writing transaction, so a version is only visible together
+        # with the data it describes
+        query = text("""
+            SELECT table_name, SUM(version) AS version
+            FROM table_versions
+            WHERE table_name IN :tables
+            GROUP BY table_name
+        """).bindparams(bindparam("tables", expanding=True))
+        try:
+            rows = self.db.execute(query, {"tables": list(tables)}).fetchall()
+        except DBAPIError as e:
+            self.db.rollback()
+            if getattr(e.orig, "pgcode", None) == UNDEFINED_TABLE:
+                VersionService.versions_available = False
+                logger.warning("table_versions not found; ETags for collection endpoints are disabled")
+            else:
+                # Dropped connection, failover, statement timeout...: no versions for this call only
+                logger.warning("Reading table versions failed: %s", e.orig)
+            return None
+        versions = {table: 0 for table in tables}
+        versions.update((row.table_name, int(row.version)) for row in rows)
+        return versions
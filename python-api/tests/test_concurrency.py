@@ -0,0 +1,118 @@
+import asyncio
+import unittest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from middleware.concurrency import (CRITICAL, HIGH, LOW, NORMAL, ConcurrencyLimiter, ConcurrencyLimitMiddleware,
+                                    GradientLimit, classify, mark_not_overload)
+from middleware.cors import FastPathCORSMiddleware
+
+def limiter_with_limit(limit: int) -> ConcurrencyLimiter:
+    return ConcurrencyLimiter(GradientLimit(initial=limit, min_limit=limit, max_limit=limit),
+                              queue_timeout_ms={HIGH: 1000, LOW: 1000})
+
+class ConcurrencyLimiterTest(unittest.TestCase):
+    def test_cancelled_waiter_does_not_leak_a_slot(self):
+        async def scenario():
+            limiter = limiter_with_limit(1)
+            self.assertTrue(await limiter.acquire(HIGH))
+            waiter = asyncio.ensure_future(limiter.acquire(HIGH))
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+
+            limiter.release(0.01, failed=False)
+            self.assertEqual(limiter.in_flight, 0)
+            self.assertTrue(await limiter.acquire(HIGH))
+
+        asyncio.run(scenario())
+
+    def test_slot_handed_to_a_cancelled_waiter_is_returned(self):
+        async def scenario():
+            limiter = limiter_with_limit(1)
+            self.assertTrue(await limiter.acquire(HIGH))
+            waiter = asyncio.ensure_future(limiter.acquire(HIGH))
+            await asyncio.sleep(0.01)
+            limiter.release(0.01, failed=False)  # hands the slot to the waiter...
+            waiter.cancel()                      # ...which is cancelled before it resumes
+            admitted, = await asyncio.gather(waiter, return_exceptions=True)
+            if admitted is True:
+                # acquire() may still report success; the caller then owns and releases the slot
+                limiter.release(0.01, failed=False)
+
+            self.assertEqual(limiter.in_flight, 0)
+            self.assertTrue(await limiter.acquire(HIGH))
+
+        asyncio.run(scenario())
+
+    def test_freed_slot_goes_to_the_highest_priority_waiter(self):
+        async def scenario():
+            limiter = limiter_with_limit(1)
+            self.assertTrue(await limiter.acquire(HIGH))
+            order = []
+
+            async def request(priority, name):
+                await limiter.acquire(priority)
+                order.append(name)
+                limiter.release(0.01, failed=False)
+
+            low = asyncio.ensure_future(request(LOW, "low"))
+            await asyncio.sleep(0)
+            high = asyncio.ensure_future(request(HIGH, "high"))
+            await asyncio.sleep(0.01)
+            limiter.release(0.01, failed=False)
+            await asyncio.gather(low, high)
+            self.assertEqual(order, ["high", "low"])
+
+        asyncio.run(scenario())
+
+class ShedResponseTest(unittest.TestCase):
+    def client(self) -> TestClient:
+        # Same middleware order as main.py: CORS outside the limiter; a limit of 0 sheds everything
+        app = FastAPI()
+        app.get("/api/v1/orders")(lambda: {})
+        limiter = ConcurrencyLimiter(GradientLimit(initial=0, min_limit=0, max_limit=0),
+                                     queue_timeout_ms={HIGH: 1, NORMAL: 1, LOW: 1})
+        app.add_middleware(ConcurrencyLimitMiddleware, limiter=limiter)
+        app.add_middleware(FastPathCORSMiddleware, allow_origins=["*"], allow_methods=["*"],
+                           allow_headers=["*"], expose_headers=["Retry-After"])
+        return TestClient(app)
+
+    def test_preflight_is_critical(self):
+        self.assertEqual(classify("OPTIONS", "/api/v1/orders"), CRITICAL)
+
+    def test_cross_origin_shed_response_is_readable(self):
+        response = self.client().get("/api/v1/orders", headers={"Origin": "https://dashboard.example"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["access-control-allow-origin"], "*")
+        self.assertIn("retry-after", response.headers["access-control-expose-headers"].lower())
+
+    def test_preflight_is_not_shed(self):
+        response = self.client().options("/api/v1/orders", headers={
+            "Origin": "https://dashboard.example", "Access-Control-Request-Method": "GET"})
+        self.assertEqual(response.status_code, 200)
+
+class FailureSignalTest(unittest.TestCase):
+    def limit_after_500(self, mark: bool) -> float:
+        app = FastAPI()
+
+        @app.get("/broken")
+        async def broken(request: Request):
+            if mark:
+                mark_not_overload(request.scope)
+            return JSONResponse({"detail": "Query budget exceeded"}, status_code=500)
+
+        limiter = limiter_with_limit(10)
+        limiter.limit.min_limit = 1
+        app.add_middleware(ConcurrencyLimitMiddleware, limiter=limiter)
+        TestClient(app).get("/broken")
+        return limiter.limit.limit
+
+    def test_server_error_cuts_the_limit(self):
+        self.assertEqual(self.limit_after_500(mark=False), 9)
+
+    def test_marked_server_error_does_not(self):
+        self.assertEqual(self.limit_after_500(mark=True), 10)
+
+if __name__ == "__main__":
+    unittest.main()
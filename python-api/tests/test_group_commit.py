@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool
+from services.group_commit import GroupCommitWriter
+
+def sqlite_engine():
+    # One shared connection: the writer applies batches from executor threads
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+
+    # pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy emit BEGIN itself
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute("PRAGMA foreign_keys = ON")
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE users (name TEXT PRIMARY KEY)")
+        # Checked at COMMIT, so a bad row here fails the shared commit rather than its operation
+        conn.exec_driver_sql("CREATE TABLE notes (user_name TEXT REFERENCES users(name) "
+                             "DEFERRABLE INITIALLY DEFERRED)")
+    return engine
+
+def insert_user(name, calls=None):
+    def operation(conn):
+        if calls is not None:
+            calls.append(name)
+        conn.execute(text("INSERT INTO users (name) VALUES (:name)"), {"name": name})
+        return name
+    return operation
+
+def insert_orphan_note(conn):
+    conn.execute(text("INSERT INTO notes (user_name) VALUES ('nobody')"))
+
+class GroupCommitWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = sqlite_engine()
+        self.writer = GroupCommitWriter(self.engine, window_ms=50, max_batch=100)
+
+    def users(self):
+        with self.engine.connect() as conn:
+            return sorted(name for name, in conn.execute(text("SELECT name FROM users")))
+
+    def submit_together(self, operations):
+        async def run():
+            await self.writer.start()
+            try:
+                return await asyncio.gather(*(self.writer.submit(operation) for operation in operations),
+                                            return_exceptions=True)
+            finally:
+                await self.writer.stop()
+        return asyncio.run(run())
+
+    def test_failing_operation_only_fails_its_caller(self):
+        results = self.submit_together([insert_user("a"), insert_user("b"), insert_user("a"), insert_user("c")])
+        self.assertEqual(results[:2] + results[3:], ["a", "b", "c"])
+        self.assertIsInstance(results[2], IntegrityError)
+        self.assertEqual(self.users(), ["a", "b", "c"])
+
+    def test_single_operation_error_is_not_replayed(self):
+        self.writer._apply([insert_user("a")])
+        calls = []
+        outcomes = self.writer._apply([insert_user("a", calls)])
+        self.assertEqual(calls, ["a"])
+        self.assertEqual(len(outcomes), 1)
+        ok, error = outcomes[0]
+        self.assertFalse(ok)
+        self.assertIsInstance(error, IntegrityError)
+
+    def test_commit_failure_fails_every_caller(self):
+        with self.assertLogs("services.group_commit", "ERROR"):
+            results = self.submit_together([insert_user("a"), insert_orphan_note, insert_user("b")])
+        self.assertTrue(all(isinstance(result, IntegrityError) for result in results))
+        self.assertEqual(self.users(), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from sqlalchemy import Column, Integer, create_engine, text
+from sqlalchemy.orm import Session, declarative_base
+from models import query_budget
+from models.query_budget import QueryBudgetExceeded, QueryStats, statement_shape
+
+Base = declarative_base()
+
+class Item(Base):
+    __tablename__ = "items"
+    id = Column(Integer, primary_key=True)
+
+class StatementShapeTest(unittest.TestCase):
+    def test_parameters_and_literals_are_removed(self):
+        self.assertEqual(statement_shape("SELECT * FROM users WHERE id = %(id_1)s"),
+                         statement_shape("SELECT * FROM users WHERE id = 42"))
+        self.assertEqual(statement_shape("SELECT * FROM users WHERE name = 'O''Brien'"),
+                         "SELECT * FROM users WHERE name = ?")
+
+    def test_in_lists_of_any_length_compare_equal(self):
+        self.assertEqual(statement_shape("SELECT * FROM orders WHERE id IN (1, 2, 3)"),
+                         statement_shape("SELECT * FROM orders\n  WHERE id IN (%s)"))
+
+    def test_different_queries_stay_different(self):
+        self.assertNotEqual(statement_shape("SELECT * FROM users WHERE id = 1"),
+                            statement_shape("SELECT * FROM orders WHERE id = 1"))
+
+class QueryStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        query_budget.install(self.engine)
+        Base.metadata.create_all(self.engine)
+
+    def session(self, stats: QueryStats) -> Session:
+        session = Session(self.engine)
+        session.info["query_stats"] = stats
+        self.addCleanup(session.close)
+        return session
+
+    def run_n_plus_one(self, session: Session, n: int):
+        for item_id in range(n):
+            session.execute(text("SELECT * FROM items WHERE id = :id"), {"id": item_id})
+
+    def test_counts_statements_and_db_time(self):
+        stats = QueryStats("GET /items", mode="log")
+        self.run_n_plus_one(self.session(stats), 3)
+        self.assertEqual(stats.statements, 3)
+        self.assertGreater(stats.db_ms, 0)
+        self.assertEqual(list(stats.shapes.values()), [3])
+
+    def test_log_mode_reports_n_plus_one(self):
+        stats = QueryStats("GET /items", mode="log", n_plus_one_threshold=5)
+        self.run_n_plus_one(self.session(stats), 5)
+        with self.assertLogs(query_budget.logger, "WARNING") as logs:
+            stats.report()
+        self.assertIn("possible N+1, statement executed 5 times", logs.output[0])
+
+    def test_reject_mode_stops_n_plus_one(self):
+        stats = QueryStats("GET /items", mode="reject", n_plus_one_threshold=5)
+        with self.assertRaises(QueryBudgetExceeded):
+            self.run_n_plus_one(self.session(stats), 10)
+        self.assertEqual(stats.statements, 5)
+
+    def test_reject_mode_enforces_statement_budget(self):
+        stats = QueryStats("GET /items", mode="reject", max_statements=2, n_plus_one_threshold=0)
+        session = self.session(stats)
+        session.execute(text("SELECT 1"))
+        session.execute(text("SELECT * FROM items"))
+        with self.assertRaises(QueryBudgetExceeded):
+            session.execute(text("SELECT count(*) FROM items"))
+
+    def test_stats_are_released_with_the_connection(self):
+        stats = QueryStats("GET /items", mode="log")
+        session = self.session(stats)
+        session.execute(text("SELECT 1"))
+        session.close()
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        self.assertEqual(stats.statements, 1)
+
+if __name__ == "__main__":
+    unittest.main()
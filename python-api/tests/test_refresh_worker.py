@@ -0,0 +1,84 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+from services import refresh_worker as refresh_module
+from services.refresh_worker import RefreshWorker
+
+class FakeSession:
+    def close(self):
+        pass
+
+class FakeVersionService:
+    def __init__(self, db):
+        pass
+
+    def get_table_versions(self, tables):
+        return None
+
+def slow_compute(seconds):
+    def compute(db, params):
+        time.sleep(seconds)
+        return b"x" * params.get("size", 10)
+    return compute
+
+@mock.patch.object(refresh_module, "SessionLocal", FakeSession)
+@mock.patch.object(refresh_module, "VersionService", FakeVersionService)
+@mock.patch.object(refresh_module, "REFRESH_MIN_AGE", 0)
+class RefreshWorkerTest(unittest.TestCase):
+    def run_worker(self, worker, scenario):
+        async def run():
+            await worker.start()
+            try:
+                return await scenario()
+            finally:
+                await worker.stop()
+        return asyncio.run(run())
+
+    def test_cold_request_does_not_wait_behind_background_refreshes(self):
+        worker = RefreshWorker(max_workers=2, foreground_workers=2)
+        worker.register("report", slow_compute(0.2), ["orders"], warm=[])
+
+        async def scenario():
+            await asyncio.gather(*(worker.get("report", {"page": page}) for page in range(20)))
+            worker.invalidate(tables=["orders"])  # 20 background refreshes, 2 s of work for 2 threads
+            started = time.perf_counter()
+            await worker.get("report", {"page": "new"})
+            return time.perf_counter() - started
+
+        self.assertLess(self.run_worker(worker, scenario), 0.5)
+
+    def test_idle_entries_are_not_refreshed_in_background(self):
+        worker = RefreshWorker()
+        calls = []
+        worker.register("report", lambda db, params: calls.append(params) or b"x", ["orders"], warm=[])
+
+        async def scenario():
+            await worker.get("report", {"page": 1})
+            worker.entries[worker._key("report", {"page": 1})].accessed_at -= 3600
+            worker.invalidate(tables=["orders"])
+            await asyncio.sleep(0.05)
+            refreshed_in_background = len(calls)
+            await worker.get("report", {"page": 1})  # stale and idle: recomputed for this caller
+            return refreshed_in_background, len(calls)
+
+        self.assertEqual(self.run_worker(worker, scenario), (1, 2))
+
+    def test_warm_entries_survive_eviction(self):
+        worker = RefreshWorker()
+        worker.register("report", slow_compute(0), ["orders"], warm=[{"size": 100}])
+
+        async def scenario():
+            for size in range(1, 6):
+                await worker.get("report", {"size": size * 1000})
+            return set(worker.entries), worker.size
+
+        with mock.patch.object(refresh_module, "REFRESH_MAX_ENTRIES", 3), \
+                mock.patch.object(refresh_module, "REFRESH_MAX_BYTES", 6000):
+            keys, size = self.run_worker(worker, scenario)
+        self.assertIn(worker._key("report", {"size": 100}), keys)
+        self.assertEqual(keys, {worker._key("report", {"size": size_}) for size_ in (100, 5000)})
+        self.assertEqual(size, 5100)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from services.version_service import VersionService
+
+class PgError(Exception):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+class FailingSession:
+    def __init__(self, error):
+        self.error = error
+        self.rollbacks = 0
+
+    def execute(self, *args, **kwargs):
+        raise self.error
+
+    def rollback(self):
+        self.rollbacks += 1
+
+class VersionServiceErrorTest(unittest.TestCase):
+    def setUp(self):
+        VersionService.versions_available = True
+
+    def tearDown(self):
+        VersionService.versions_available = True
+
+    def test_transient_error_only_fails_this_call(self):
+        db = FailingSession(OperationalError("SELECT", {}, PgError("57P01")))  # admin_shutdown
+        self.assertIsNone(VersionService(db).get_table_versions(["users"]))
+        self.assertEqual(db.rollbacks, 1)
+        self.assertTrue(VersionService.versions_available)
+
+    def test_missing_table_disables_versions(self):
+        db = FailingSession(ProgrammingError("SELECT", {}, PgError("42P01")))
+        self.assertIsNone(VersionService(db).get_table_versions(["users"]))
+        self.assertFalse(VersionService.versions_available)
+
+if __name__ == "__main__":
+    unittest.main()